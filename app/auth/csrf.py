@@ -1,56 +1,140 @@
+import binascii
+import hmac
 import os
-import secrets
-from typing import Callable
+from typing import Iterable, List, Optional, Tuple
 
-from fastapi import Request, Response
-from urllib.parse import parse_qs
-from starlette.middleware.base import BaseHTTPMiddleware, RequestResponseEndpoint
+from urllib.parse import unquote_plus
+from starlette.datastructures import MutableHeaders
+from starlette.responses import Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
 
 CSRF_COOKIE_NAME = os.getenv("CSRF_COOKIE_NAME", "csrftoken")
 CSRF_HEADER_NAME = os.getenv("CSRF_HEADER_NAME", "x-csrf-token")
 
 
-def _is_safe_method(method: str) -> bool:
-    return method.upper() in {"GET", "HEAD", "OPTIONS", "TRACE"}
+# base64 -> urlsafe алфавит без промежуточных обёрток модуля base64
+_URLSAFE_TRANSLATE = bytes.maketrans(b"+/", b"-_")
 
+# ASGI гарантирует, что scope["method"] уже в верхнем регистре
+_SAFE_METHODS = frozenset(("GET", "HEAD", "OPTIONS", "TRACE"))
+# Префиксы API, для которых CSRF проверка не выполняется
+_API_SKIP = ("/cms/api/", "/api/")
 
-class CSRFMiddleware(BaseHTTPMiddleware):
-    def __init__(self, app, cookie_name: str = CSRF_COOKIE_NAME) -> None:  # type: ignore[no-untyped-def]
-        super().__init__(app)
+
+def _new_token() -> str:
+    """Сгенерировать CSRF токен: 24 случайных байта (192 бита) -> 32 символа urlsafe base64"""
+    return binascii.b2a_base64(os.urandom(24), newline=False).translate(_URLSAFE_TRANSLATE).decode("ascii")
+
+
+def _get_header(headers: Iterable[Tuple[bytes, bytes]], name: bytes) -> Optional[bytes]:
+    """Найти значение заголовка в сыром ASGI списке (имена уже в нижнем регистре)"""
+    for key, value in headers:
+        if key == name:
+            return value
+    return None
+
+
+def _get_cookie(raw_cookie: bytes, name: str) -> Optional[str]:
+    """Извлечь одно значение cookie без построения полного словаря"""
+    for chunk in raw_cookie.decode("latin-1").split(";"):
+        key, sep, value = chunk.partition("=")
+        if sep and key.strip() == name:
+            return value.strip()
+    return None
+
+
+def _extract_form_token(body: bytes, field: bytes = b"csrf_token=") -> str:
+    """Найти значение одного поля в urlencoded теле без разбора всей формы"""
+    idx = body.find(field)
+    # Поле должно начинаться с начала тела или сразу после '&'
+    while idx > 0 and body[idx - 1:idx] != b"&":
+        idx = body.find(field, idx + 1)
+    if idx < 0:
+        return ""
+    start = idx + len(field)
+    end = body.find(b"&", start)
+    raw = body[start:end] if end >= 0 else body[start:]
+    return unquote_plus(raw.decode("latin-1"))
+
+
+async def _read_body(receive: Receive) -> Tuple[List[Message], bytes]:
+    """Вычитать тело запроса, сохранив исходные сообщения для повторной отдачи"""
+    messages: List[Message] = []
+    chunks: List[bytes] = []
+    while True:
+        message = await receive()
+        messages.append(message)
+        if message["type"] != "http.request":
+            break
+        chunks.append(message.get("body", b""))
+        if not message.get("more_body", False):
+            break
+    return messages, b"".join(chunks)
+
+
+def _replay_receive(messages: List[Message], receive: Receive) -> Receive:
+    """Отдать downstream уже прочитанные сообщения, затем проксировать исходный receive"""
+    pending = iter(messages)
+
+    async def replay() -> Message:
+        message = next(pending, None)
+        if message is not None:
+            return message
+        return await receive()
+
+    return replay
+
+
+class CSRFMiddleware:
+    """
+    Чистый ASGI middleware для CSRF защиты (double submit cookie).
+    Тело запроса читается только когда токен не пришел в заголовке.
+    """
+
+    def __init__(self, app: ASGIApp, cookie_name: str = CSRF_COOKIE_NAME) -> None:
+        self.app = app
         self.cookie_name = cookie_name
+        self.header_name = CSRF_HEADER_NAME.lower().encode("latin-1")
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
 
-    async def dispatch(self, request: Request, call_next: RequestResponseEndpoint) -> Response:
-        token = request.cookies.get(self.cookie_name)
+        headers = scope["headers"]
+        raw_cookie = _get_header(headers, b"cookie")
+        token = _get_cookie(raw_cookie, self.cookie_name) if raw_cookie else None
         if not token:
-            token = secrets.token_urlsafe(32)
-        
+            token = _new_token()
+
+        path = scope["path"]
         # Пропускаем CSRF проверку для API endpoints
-        if request.url.path.startswith("/cms/api/") or request.url.path.startswith("/api/"):
-            response = await call_next(request)
-            response.set_cookie(self.cookie_name, token, httponly=False, samesite="lax")
-            return response
-            
-        if not _is_safe_method(request.method):
-            header = request.headers.get(CSRF_HEADER_NAME)
-            if not header or header != token:
-                # Попытка валидации через скрытое поле формы csrf_token для обычных form POST
+        if not path.startswith(_API_SKIP) and scope["method"] not in _SAFE_METHODS:
+            header = _get_header(headers, self.header_name)
+            if not header or not hmac.compare_digest(header, token.encode("latin-1")):
+                # Попытка валидации через скрытое поле формы csrf_token для обычных form POST.
+                # Тело читаем только для urlencoded форм - остальные запросы отклоняются сразу
+                content_type = _get_header(headers, b"content-type") or b""
+                if b"application/x-www-form-urlencoded" not in content_type:
+                    await Response(status_code=403)(scope, receive, send)
+                    return
                 try:
-                    body = await request.body()
-                    content_type = request.headers.get("content-type", "")
-                    if "application/x-www-form-urlencoded" in content_type:
-                        form = parse_qs(body.decode(errors="ignore"))
-                        form_token = (form.get("csrf_token") or [""])[0]
-                        if form_token != token:
-                            return Response(status_code=403)
-                        # Восстанавливаем тело для downstream
-                        request._body = body  # type: ignore[attr-defined]
-                    else:
-                        return Response(status_code=403)
+                    messages, body = await _read_body(receive)
+                    form_token = _extract_form_token(body)
+                    if not hmac.compare_digest(form_token, token):
+                        raise ValueError("csrf token mismatch")
                 except Exception:
-                    return Response(status_code=403)
-        response = await call_next(request)
-        response.set_cookie(self.cookie_name, token, httponly=False, samesite="lax")
-        return response
+                    await Response(status_code=403)(scope, receive, send)
+                    return
+                # Восстанавливаем тело для downstream
+                receive = _replay_receive(messages, receive)
+
+        cookie_value = f"{self.cookie_name}={token}; Path=/; SameSite=lax"
 
+        async def send_with_cookie(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message).append("set-cookie", cookie_value)
+            await send(message)
 
+        await self.app(scope, receive, send_with_cookie)
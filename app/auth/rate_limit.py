@@ -1,33 +1,173 @@
+import hashlib
+import ipaddress
+import logging
+import os
+import sqlite3
 import time
-from collections import deque
-from typing import Deque, Dict
+from array import array
+from collections import OrderedDict
+from typing import Optional, Tuple, Union
+
+from app.database.db import get_connection
+
+logger = logging.getLogger(__name__)
+
+
+class _Bucket:
+    """Кольцевой буфер временных меток одного ключа"""
+
+    __slots__ = ("timestamps", "head")
+
+    def __init__(self, size: int) -> None:
+        self.timestamps = array("d", [float("-inf")] * size)
+        self.head = 0
 
 
 class SlidingWindowLimiter:
-    def __init__(self, max_events: int, window_seconds: int) -> None:
+    def __init__(self, max_events: int, window_seconds: int, max_keys: int = 100_000) -> None:
         self.max_events = max_events
         self.window_seconds = window_seconds
-        self._buckets: Dict[str, Deque[float]] = {}
+        self.max_keys = max_keys
+        # LRU по ключам: холодные ключи вытесняются, словарь не растет бесконечно
+        self._buckets: "OrderedDict[str, _Bucket]" = OrderedDict()
 
     def allow(self, key: str) -> bool:
+        if self.max_events <= 0:
+            return False
         now = time.monotonic()
-        dq = self._buckets.setdefault(key, deque())
-        # Drop old events
-        cutoff = now - self.window_seconds
-        while dq and dq[0] < cutoff:
-            dq.popleft()
-        if len(dq) >= self.max_events:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            if len(self._buckets) >= self.max_keys:
+                self._buckets.popitem(last=False)
+            bucket = self._buckets[key] = _Bucket(self.max_events)
+        else:
+            self._buckets.move_to_end(key)
+        # В позиции head лежит самое старое из последних max_events событий:
+        # если оно еще внутри окна, лимит исчерпан
+        if bucket.timestamps[bucket.head] >= now - self.window_seconds:
             return False
-        dq.append(now)
+        bucket.timestamps[bucket.head] = now
+        bucket.head = (bucket.head + 1) % self.max_events
         return True
 
 
-import os
+class ShardedSlidingWindowLimiter:
+    """Набор независимых лимитеров, ключ попадает в шард по своему хэшу"""
+
+    def __init__(self, max_events: int, window_seconds: int, shards: int = 16) -> None:
+        if shards <= 0 or shards & (shards - 1):
+            raise ValueError("shards must be a positive power of two")
+        self._mask = shards - 1
+        self._shards = [SlidingWindowLimiter(max_events, window_seconds) for _ in range(shards)]
+
+    def allow(self, key: str) -> bool:
+        return self._shards[hash(key) & self._mask].allow(key)
+
+
+class SQLiteTokenBucketLimiter:
+    """
+    Token bucket в общей SQLite базе: лимит действует сразу на все воркеры uvicorn/gunicorn.
+    Решение принимается одним атомарным UPSERT ... RETURNING без блокировок в Python.
+    Запись ждет занятую БД не дольше timeout; при ошибке или занятой БД решение принимает
+    локальный лимитер процесса. allow() обращается к диску - из async кода вызывать в потоке
+    """
+
+    # Все выражения SET вычисляются по старым значениям строки
+    _ALLOW_SQL = """
+        INSERT INTO rate_limits (key, tokens, updated_at, allowed)
+        VALUES (:key, :burst - 1, :now, 1)
+        ON CONFLICT(key) DO UPDATE SET
+            tokens = MIN(:burst, tokens + (:now - updated_at) * :rate)
+                     - (MIN(:burst, tokens + (:now - updated_at) * :rate) >= 1),
+            allowed = MIN(:burst, tokens + (:now - updated_at) * :rate) >= 1,
+            updated_at = :now
+        RETURNING allowed
+    """
+    # Ведро, полностью восстановившееся с момента последнего обращения, неотличимо от отсутствующего
+    _CLEANUP_SQL = "DELETE FROM rate_limits WHERE updated_at < ?"
+
+    def __init__(
+        self,
+        rate: float,
+        burst: int,
+        fallback: Optional[ShardedSlidingWindowLimiter] = None,
+        cleanup_interval: float = 60.0,
+        timeout: float = 0.2,
+    ) -> None:
+        self.rate = rate
+        self.burst = burst
+        self.fallback = fallback
+        self.cleanup_interval = cleanup_interval
+        self.timeout = timeout
+        self._refill_seconds = burst / rate if rate > 0 else float("inf")
+        self._next_cleanup = 0.0
+
+    def allow(self, key: str) -> bool:
+        if self.burst <= 0:
+            return False
+        now = time.time()
+        params = {"key": key, "burst": self.burst, "rate": self.rate, "now": now}
+        try:
+            with get_connection(row_factory_dict=False, write=True, timeout=self.timeout) as conn:
+                allowed = conn.execute(self._ALLOW_SQL, params).fetchone()[0]
+                if time.monotonic() >= self._next_cleanup:
+                    self._next_cleanup = time.monotonic() + self.cleanup_interval
+                    conn.execute(self._CLEANUP_SQL, (now - self._refill_seconds,))
+                conn.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"Rate limit storage unavailable, using in-process limiter: {e}")
+            return self.fallback.allow(key) if self.fallback is not None else True
+        return bool(allowed)
+
+
+def _parse_networks(value: str) -> Tuple[Union[ipaddress.IPv4Network, ipaddress.IPv6Network], ...]:
+    """Разобрать список CIDR через запятую"""
+    return tuple(ipaddress.ip_network(item.strip(), strict=False) for item in value.split(",") if item.strip())
+
+
+# Прокси, которым доверяем X-Forwarded-For (например, nginx на том же хосте: 127.0.0.1/32,::1/128).
+# По умолчанию заголовок не учитывается - его может подделать любой клиент
+TRUSTED_PROXIES = _parse_networks(os.getenv("TRUSTED_PROXIES", ""))
+
+
+def _is_trusted(ip: str) -> bool:
+    try:
+        address = ipaddress.ip_address(ip)
+    except ValueError:
+        return False
+    return any(address in network for network in TRUSTED_PROXIES)
+
+
+def client_ip(peer: Optional[str], forwarded_for: str = "") -> str:
+    """
+    Определить IP клиента. X-Forwarded-For учитывается, только если соединение пришло от доверенного прокси;
+    берется самый правый адрес цепочки, не принадлежащий доверенным прокси (левые части подделываются клиентом)
+    """
+    if not peer:
+        return "unknown"
+    if not forwarded_for or not _is_trusted(peer):
+        return peer
+    for hop in reversed(forwarded_for.split(",")):
+        hop = hop.strip()
+        if hop and not _is_trusted(hop):
+            return hop
+    return peer
+
+
+def client_key(peer: Optional[str], forwarded_for: str = "") -> str:
+    """Короткий ключ лимитера фиксированной длины для IP клиента"""
+    return hashlib.blake2s(client_ip(peer, forwarded_for).encode("utf-8"), digest_size=8).hexdigest()
+
 
 # Get rate limiting config from environment
 _max_attempts = int(os.getenv("LOGIN_MAX_ATTEMPTS", "5"))
 _window_seconds = int(os.getenv("LOGIN_WINDOW_SECONDS", "60"))
 
-login_limiter = SlidingWindowLimiter(max_events=_max_attempts, window_seconds=_window_seconds)
+# Общий для всех воркеров лимит: _max_attempts попыток сразу, затем пополнение равномерно за окно
+login_limiter = SQLiteTokenBucketLimiter(
+    rate=_max_attempts / _window_seconds,
+    burst=_max_attempts,
+    fallback=ShardedSlidingWindowLimiter(max_events=_max_attempts, window_seconds=_window_seconds),
+)
 
 
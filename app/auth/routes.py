@@ -1,20 +1,34 @@
-import os
-from typing import Optional, Dict, Any
+import asyncio
+import logging
+import re
+import time
+from functools import lru_cache
+from typing import Optional, Dict, Any, Tuple
+from urllib.parse import urlencode
 
 from fastapi import APIRouter, Depends, Form, HTTPException, Request, Response
-from fastapi.responses import RedirectResponse
-from fastapi.templating import Jinja2Templates
+from fastapi.responses import HTMLResponse, JSONResponse, RedirectResponse
+from markupsafe import escape
 
-from app.auth.rate_limit import login_limiter
-from app.auth.security import create_access_token, verify_password, hash_password
+from app.auth.csrf import CSRF_COOKIE_NAME
+from app.auth.rate_limit import client_key, login_limiter
+from app.auth.security import JWT_EXPIRES_SECONDS, create_access_token, hash_password_async, verify_password_async
 from app.auth.security_headers import set_secure_cookie, delete_secure_cookie
-from app.database.db import query_one, execute
+from app.database.db import query_one, query_all, execute
+from app.utils.cache import text_cache, token_cache, user_cache
+from app.utils.templates import create_templates
 from email_validator import validate_email, EmailNotValidError
 from app.site.middleware import get_language_from_request, get_supported_languages_from_request, get_language_urls_from_request, get_cms_url, get_cms_dashboard_url
 
 
 router = APIRouter()
-templates = Jinja2Templates(directory="app/templates")
+templates = create_templates()
+
+# Шаблоны страниц авторизации, компилируемые заранее при старте приложения
+_AUTH_TEMPLATES = ("crm/login.html", "crm/register.html")
+
+logger = logging.getLogger(__name__)
+
 
 def add_template_functions(context: dict) -> dict:
     """Добавить глобальные функции в контекст шаблона"""
@@ -25,44 +39,179 @@ def add_template_functions(context: dict) -> dict:
     return context
 
 
+# Кэш отрендеренных страниц с ошибками формы: (шаблон, язык, путь, ошибка, base_url) -> (истекает, html).
+# Значения, уникальные для запроса (CSRF токен, next), подставляются в готовый HTML
+_ERROR_PAGE_TTL = 60
+_ERROR_PAGE_MAX_ENTRIES = 256
+_CSRF_PLACEHOLDER = "__csrf_token_placeholder__"
+_NEXT_URL_PLACEHOLDER = "__next_url_placeholder__"
+_error_pages: Dict[Tuple[str, ...], Tuple[float, str]] = {}
+
+
+def _render_error_page(request: Request, template_name: str, context: dict, status_code: int) -> HTMLResponse:
+    """Отдать страницу формы с ошибкой из кэша, рендеря шаблон только при промахе"""
+    key = (template_name, context["lang"], request.url.path, context["error"], str(request.base_url))
+    now = time.monotonic()
+    entry = _error_pages.get(key)
+    if entry is None or entry[0] < now:
+        render_context = dict(context, csrf_token=_CSRF_PLACEHOLDER, next_url=_NEXT_URL_PLACEHOLDER)
+        html = templates.get_template(template_name).render(add_template_functions(render_context))
+        if len(_error_pages) >= _ERROR_PAGE_MAX_ENTRIES:
+            _error_pages.clear()
+        entry = _error_pages[key] = (now + _ERROR_PAGE_TTL, html)
+    html = entry[1].replace(
+        _CSRF_PLACEHOLDER, str(escape(request.cookies.get(CSRF_COOKIE_NAME, "")))
+    ).replace(
+        _NEXT_URL_PLACEHOLDER, str(escape(context.get("next_url", "")))
+    )
+    return HTMLResponse(html, status_code=status_code)
+
+
+# Быстрый путь для типичных ASCII адресов при логине: полный validate_email (IDNA и т.д.) не нужен
+_EMAIL_FAST = re.compile(
+    r"^[A-Za-z0-9_%+-]+(?:\.[A-Za-z0-9_%+-]+)*@"
+    r"(?:[A-Za-z0-9](?:[A-Za-z0-9-]{0,61}[A-Za-z0-9])?\.)+[A-Za-z]{2,24}$"
+)
+
+
+# Максимальная длина email по RFC 5321; более длинные строки не попадают в кэш нормализации
+_EMAIL_MAX_LENGTH = 254
+
+
+@lru_cache(maxsize=4096)
+def _validated_email(email: str) -> Optional[str]:
+    """validate_email(...).normalized с кэшем по исходной строке; None для невалидного адреса"""
+    try:
+        return validate_email(email, check_deliverability=False).normalized
+    except EmailNotValidError:
+        return None
+
+
+def _normalize_email(email: str) -> Optional[str]:
+    """Нормализовать email для регистрации; None для невалидного адреса"""
+    if len(email) > _EMAIL_MAX_LENGTH:
+        return None
+    return _validated_email(email)
+
+
+def _normalize_login_email(email: str) -> Optional[str]:
+    """Нормализовать email для логина; при отсутствии совпадения с быстрым путем - через validate_email"""
+    if len(email) > _EMAIL_MAX_LENGTH:
+        return None
+    if _EMAIL_FAST.match(email):
+        # Как и validate_email(...).normalized: домен в нижнем регистре, локальная часть без изменений
+        local, _, domain = email.rpartition("@")
+        return f"{local}@{domain.lower()}"
+    return _validated_email(email)
+
+
+def preload_templates() -> None:
+    """Скомпилировать шаблоны авторизации заранее, чтобы первый запрос не платил за компиляцию"""
+    for template_name in _AUTH_TEMPLATES:
+        templates.env.get_template(template_name)
+
+
 def _get_user_by_email(email: str) -> Optional[dict]:
     return query_one("SELECT id, email, password_hash, role FROM users WHERE email = ?", (email,))
 
 
+# Ключи переводов для страниц авторизации
+_LOGIN_KEYS = (
+    'title', 'subtitle', 'email', 'password', 'password_placeholder',
+    'forgot_password', 'login_button', 'no_account', 'register_link', 
+    'invalid_email', 'password_too_short', 'invalid_credentials', 'login_success'
+)
+# Коды ошибок формы логина для ?error=: код -> (ключ перевода или None, текст по умолчанию)
+_LOGIN_ERRORS = {
+    "invalid_email": ("invalid_email", "Invalid email format"),
+    "password_too_short": ("password_too_short", "Password must be at least 8 characters"),
+    "password_too_long": (None, "Password too long (maximum 72 bytes)"),
+    "invalid_credentials": ("invalid_credentials", "Invalid email or password"),
+}
+_REGISTER_KEYS = (
+    'title', 'subtitle', 'email', 'email_placeholder', 'password_label', 
+    'password_placeholder', 'confirm_password', 'confirm_password_placeholder',
+    'create_account', 'already_have_account', 'sign_in', 'invalid_email',
+    'password_too_short', 'passwords_dont_match', 'email_exists', 'registration_success'
+)
+_HEADER_KEYS = ('theme', 'home')
+
+
+def _load_texts_many(pages: tuple, lang: str) -> Dict[str, Dict[str, str]]:
+    """Получить тексты нескольких страниц; промахи text_cache добираются одним IN-запросом"""
+    result: Dict[str, Dict[str, str]] = {}
+    missing = []
+    for page in pages:
+        texts = text_cache.get(page, lang)
+        if texts is None:
+            missing.append(page)
+        else:
+            result[page] = texts
+    if missing:
+        placeholders = ",".join("?" * len(missing))
+        rows = query_all(
+            f"SELECT page, key, value FROM texts WHERE lang = ? AND page IN ({placeholders})",
+            (lang, *missing)
+        )
+        loaded: Dict[str, Dict[str, str]] = {page: {} for page in missing}
+        for row in rows:
+            loaded[row["page"]][row["key"]] = row["value"]
+        for page, texts in loaded.items():
+            text_cache.set(page, lang, texts)
+        result.update(loaded)
+    return result
+
+
+def _load_texts(page: str, lang: str) -> Dict[str, str]:
+    """Получить все тексты страницы одним запросом, с кэшированием в text_cache"""
+    return _load_texts_many((page,), lang)[page]
+
+
+def _get_translations(page: str, keys: tuple, lang: str) -> Dict[str, str]:
+    """Получить переводы по списку ключей; отсутствующие ключи - пустые строки"""
+    try:
+        texts = _load_texts(page, lang)
+    except Exception:
+        texts = {}
+    return {key: texts.get(key, "") for key in keys}
+
+
+def _get_page_translations(page: str, keys: tuple, lang: str) -> Dict[str, str]:
+    """Переводы страницы вместе с переводами Header - один запрос к БД на промах кэша"""
+    try:
+        texts = _load_texts_many((page, 'header'), lang)
+    except Exception:
+        texts = {page: {}, 'header': {}}
+    translations = {key: texts[page].get(key, "") for key in keys}
+    header = texts['header']
+    translations.update({key: header.get(key, "") for key in _HEADER_KEYS})
+    return translations
+
+
 def get_text(page: str, key: str, lang: str = "en") -> str:
     """Получить текст из БД"""
     try:
-        result = query_one(
-            "SELECT value FROM texts WHERE page = ? AND key = ? AND lang = ?",
-            (page, key, lang)
-        )
-        return result.get("value", "") if result else ""
+        return _load_texts(page, lang).get(key, "")
     except Exception:
         return ""
 
 
+# Языковые префиксы URL: /{lang} или /{lang}/...
+_LANG_PREFIX = {"/ua": "ua", "/ru": "ru", "/en": "en"}
+
+
 def get_language_from_url(request: Request) -> str:
     """Получить язык из URL запроса"""
     from app.site.config import get_default_language
     
-    url_path = str(request.url.path)
+    url_path = request.url.path
     
     # НОВАЯ СТРУКТУРА: домен → язык → страница
-    # Универсальная проверка для всех типов страниц: /{lang}/...
-    if url_path.startswith('/ua/'):
-        return 'ua'
-    elif url_path.startswith('/ru/'):
-        return 'ru'
-    elif url_path.startswith('/en/'):
-        return 'en'
-    elif url_path == '/ua':
-        return 'ua'
-    elif url_path == '/ru':
-        return 'ru'
-    elif url_path == '/en':
-        return 'en'
-    else:
-        return get_default_language()
+    # Один поиск в словаре вместо цепочки startswith/==
+    lang = _LANG_PREFIX.get(url_path[:3])
+    if lang and url_path[3:4] in ("", "/"):
+        return lang
+    return get_default_language()
 
 def get_cms_redirect_url(lang: str) -> str:
     """Получить URL для редиректа на CMS с учетом языка"""
@@ -79,37 +228,18 @@ def get_cms_redirect_url(lang: str) -> str:
 
 def get_login_translations(lang: str) -> Dict[str, str]:
     """Получить переводы для страницы логина"""
-    translations = {}
-    
-    # Список ключей переводов для логина
-    translation_keys = [
-        'title', 'subtitle', 'email', 'password', 'password_placeholder',
-        'forgot_password', 'login_button', 'no_account', 'register_link', 
-        'invalid_email', 'password_too_short', 'invalid_credentials', 'login_success'
-    ]
-    
-    for key in translation_keys:
-        translations[key] = get_text('login', key, lang)
-    
-    return translations
+    return _get_translations('login', _LOGIN_KEYS, lang)
 
 
 def get_header_translations(lang: str) -> Dict[str, str]:
     """Получить переводы для Header"""
-    translations = {}
-    
-    # Список ключей переводов для Header
-    translation_keys = ['theme', 'home']
-    
-    for key in translation_keys:
-        translations[key] = get_text('header', key, lang)
-    
-    return translations
+    return _get_translations('header', _HEADER_KEYS, lang)
 
 
 
 
 @router.get("/login")
+@router.get("/{lang:lang}/login")
 async def login_form(request: Request):
     # Получаем язык и настройки мультиязычности
     lang = get_language_from_request(request)
@@ -120,9 +250,14 @@ async def login_form(request: Request):
     next_url = request.query_params.get("next", get_cms_redirect_url(lang))
     
     # Получаем переводы для логина и header
-    translations = get_login_translations(lang)
-    header_translations = get_header_translations(lang)
-    translations.update(header_translations)
+    translations = _get_page_translations('login', _LOGIN_KEYS, lang)
+    
+    # Ошибка неудачного POST /login приходит кодом в ?error= (Post/Redirect/Get)
+    error = None
+    login_error = _LOGIN_ERRORS.get(request.query_params.get("error", ""))
+    if login_error:
+        key, default = login_error
+        error = translations.get(key, default) if key else default
     
     context = {
         "request": request,
@@ -130,127 +265,64 @@ async def login_form(request: Request):
         "supported_languages": supported_languages,
         "language_urls": language_urls,
         "next_url": next_url,
+        "error": error,
         "t": translations
     }
     return templates.TemplateResponse("crm/login.html", add_template_functions(context))
 
-# Языковые роуты для логина
-@router.get("/ru/login")
-async def login_form_ru(request: Request):
-    return await login_form(request)
-
-@router.get("/ua/login")
-async def login_form_ua(request: Request):
-    return await login_form(request)
-
-@router.get("/en/login")
-async def login_form_en(request: Request):
-    return await login_form(request)
-
-# POST роуты для языковых версий login
-@router.post("/ru/login")
-async def login_ru(request: Request, response: Response, email: str = Form(...), password: str = Form(...)):
-    return await login(request, response, email, password)
-
-@router.post("/ua/login")
-async def login_ua(request: Request, response: Response, email: str = Form(...), password: str = Form(...)):
-    return await login(request, response, email, password)
-
-@router.post("/en/login")
-async def login_en(request: Request, response: Response, email: str = Form(...), password: str = Form(...)):
-    return await login(request, response, email, password)
 
 
 @router.post("/login")
+@router.post("/{lang:lang}/login")
 async def login(request: Request, response: Response, email: str = Form(...), password: str = Form(...)):
-    client_key = request.client.host if request.client else "unknown"
-    if not login_limiter.allow(f"login:{client_key}"):
+    # login_limiter используется только для логина, префикс в ключе не нужен
+    limiter_key = client_key(request.client.host if request.client else None, request.headers.get("x-forwarded-for", ""))
+    # Лимитер пишет в SQLite - вызываем в пуле потоков, чтобы занятая БД не блокировала event loop
+    if not await asyncio.to_thread(login_limiter.allow, limiter_key):
         raise HTTPException(status_code=429, detail="Too many attempts. Try later.")
 
-    # Получаем язык и переводы для отображения ошибок
+    # Получаем язык: переводы для ошибок загружает GET формы, на который перенаправляем
     lang = get_language_from_request(request)
-    supported_languages = get_supported_languages_from_request(request)
-    language_urls = get_language_urls_from_request(request)
-    translations = get_login_translations(lang)
-    header_translations = get_header_translations(lang)
-    translations.update(header_translations)
     
     # Получаем URL для редиректа после логина
     next_url = request.query_params.get("next", get_cms_redirect_url(lang))
 
+    def fail(error_code: str, status_code: int) -> Response:
+        # Клиентам API отдаем статус напрямую, браузер перенаправляем на форму без рендера шаблона в POST
+        if "application/json" in request.headers.get("accept", ""):
+            return JSONResponse({"detail": _LOGIN_ERRORS[error_code][1]}, status_code=status_code)
+        query = {"error": error_code}
+        if "next" in request.query_params:
+            query["next"] = next_url
+        return RedirectResponse(f"{request.url.path}?{urlencode(query)}", status_code=303)
+
     # validate email
-    try:
-        email = validate_email(email, check_deliverability=False).normalized
-    except EmailNotValidError:
-        context = {
-            "request": request, 
-            "error": translations.get('invalid_email', 'Invalid email format'),
-            "lang": lang,
-            "supported_languages": supported_languages,
-            "language_urls": language_urls,
-            "next_url": next_url,
-            "t": translations
-        }
-        return templates.TemplateResponse("crm/login.html", add_template_functions(context), status_code=400)
+    email = _normalize_login_email(email)
+    if email is None:
+        return fail("invalid_email", 400)
 
     # validate password length
     if len(password) < 8:
-        context = {
-            "request": request, 
-            "error": translations.get('password_too_short', 'Password must be at least 8 characters'),
-            "lang": lang,
-            "supported_languages": supported_languages,
-            "language_urls": language_urls,
-            "next_url": next_url,
-            "t": translations
-        }
-        return templates.TemplateResponse("crm/login.html", add_template_functions(context), status_code=400)
-    if len(password.encode('utf-8')) > 72:
-        context = {
-            "request": request, 
-            "error": "Password too long (maximum 72 bytes)",
-            "lang": lang,
-            "supported_languages": supported_languages,
-            "language_urls": language_urls,
-            "next_url": next_url,
-            "t": translations
-        }
-        return templates.TemplateResponse("crm/login.html", add_template_functions(context), status_code=400)
+        return fail("password_too_short", 400)
+    # Кодируем пароль один раз: те же байты идут в проверку длины и в bcrypt
+    password_bytes = password.encode('utf-8')
+    if len(password_bytes) > 72:
+        return fail("password_too_long", 400)
 
     user = _get_user_by_email(email)
     if not user:
-        import logging
-        logger = logging.getLogger(__name__)
-        logger.warning(f"User not found for email: {email}")
-        context = {
-            "request": request, 
-            "error": translations.get('invalid_credentials', 'Invalid email or password'),
-            "lang": lang,
-            "supported_languages": supported_languages,
-            "language_urls": language_urls,
-            "next_url": next_url,
-            "t": translations
-        }
-        return templates.TemplateResponse("crm/login.html", add_template_functions(context), status_code=401)
+        logger.warning("User not found for email: %s", email)
+        # Тратим на отказ столько же времени, сколько на неверный пароль
+        await verify_password_async(password_bytes, None)
+        return fail("invalid_credentials", 401)
     
-    import logging
-    logger = logging.getLogger(__name__)
-    logger.info(f"Attempting login for user: {email}")
-    logger.info(f"Stored hash: {user['password_hash'][:20]}...")
+    logger.info("Attempting login for user: %s", email)
     
-    if not verify_password(password, user["password_hash"]):
-        logger.warning(f"Password verification failed for user: {email}")
-        context = {
-            "request": request, 
-            "error": translations.get('invalid_credentials', 'Invalid email or password'),
-            "lang": lang,
-            "supported_languages": supported_languages,
-            "language_urls": language_urls,
-            "next_url": next_url,
-            "t": translations
-        }
-        return templates.TemplateResponse("crm/login.html", add_template_functions(context), status_code=401)
+    if not await verify_password_async(password_bytes, user["password_hash"]):
+        logger.warning("Password verification failed for user: %s", email)
+        return fail("invalid_credentials", 401)
 
+    user_cache.set(user["id"], True)
     token = create_access_token(subject=str(user["id"]), role=user["role"])
     # Используем сохраненный URL для редиректа или дефолтный
     resp = RedirectResponse(url=next_url, status_code=302)
@@ -259,7 +331,7 @@ async def login(request: Request, response: Response, email: str = Form(...), pa
         response=resp,
         key="access_token",
         value=token,
-        max_age=int(os.getenv("JWT_EXPIRES_MINUTES", "15")) * 60,
+        max_age=JWT_EXPIRES_SECONDS,
         httponly=True,
         samesite="lax"
     )
@@ -268,22 +340,10 @@ async def login(request: Request, response: Response, email: str = Form(...), pa
 
 def get_register_translations(lang: str) -> Dict[str, str]:
     """Получить переводы для страницы регистрации"""
-    translations = {}
-    
-    # Список ключей переводов для регистрации
-    translation_keys = [
-        'title', 'subtitle', 'email', 'email_placeholder', 'password_label', 
-        'password_placeholder', 'confirm_password', 'confirm_password_placeholder',
-        'create_account', 'already_have_account', 'sign_in', 'invalid_email',
-        'password_too_short', 'passwords_dont_match', 'email_exists', 'registration_success'
-    ]
-    
-    for key in translation_keys:
-        translations[key] = get_text('register', key, lang)
-    
-    return translations
+    return _get_translations('register', _REGISTER_KEYS, lang)
 
 @router.get("/register")
+@router.get("/{lang:lang}/register")
 async def register_form(request: Request):
     # Получаем язык и настройки мультиязычности
     lang = get_language_from_request(request)
@@ -291,9 +351,7 @@ async def register_form(request: Request):
     language_urls = get_language_urls_from_request(request)
     
     # Получаем переводы для регистрации и header
-    translations = get_register_translations(lang)
-    header_translations = get_header_translations(lang)
-    translations.update(header_translations)
+    translations = _get_page_translations('register', _REGISTER_KEYS, lang)
     
     context = {
         "request": request,
@@ -304,118 +362,55 @@ async def register_form(request: Request):
     }
     return templates.TemplateResponse("crm/register.html", add_template_functions(context))
 
-# Языковые роуты для регистрации
-@router.get("/ru/register")
-async def register_form_ru(request: Request):
-    return await register_form(request)
-
-@router.get("/ua/register")
-async def register_form_ua(request: Request):
-    return await register_form(request)
-
-@router.get("/en/register")
-async def register_form_en(request: Request):
-    return await register_form(request)
-
-# POST роуты для языковых версий register
-@router.post("/ru/register")
-async def register_ru(request: Request, email: str = Form(...), password: str = Form(...), confirm_password: str = Form(...)):
-    return await register(request, email, password, confirm_password)
-
-@router.post("/ua/register")
-async def register_ua(request: Request, email: str = Form(...), password: str = Form(...), confirm_password: str = Form(...)):
-    return await register(request, email, password, confirm_password)
-
-@router.post("/en/register")
-async def register_en(request: Request, email: str = Form(...), password: str = Form(...), confirm_password: str = Form(...)):
-    return await register(request, email, password, confirm_password)
 
 
 @router.post("/register")
+@router.post("/{lang:lang}/register")
 async def register(request: Request, email: str = Form(...), password: str = Form(...), confirm_password: str = Form(...)):
     # Получаем язык и переводы для отображения ошибок
     lang = get_language_from_request(request)
     supported_languages = get_supported_languages_from_request(request)
     language_urls = get_language_urls_from_request(request)
-    translations = get_register_translations(lang)
-    header_translations = get_header_translations(lang)
-    translations.update(header_translations)
+    translations = _get_page_translations('register', _REGISTER_KEYS, lang)
+
+    # Общий контекст для всех ответов с ошибкой
+    base_context = {
+        "request": request,
+        "lang": lang,
+        "supported_languages": supported_languages,
+        "language_urls": language_urls,
+        "t": translations
+    }
+
+    def fail(error: str, status_code: int) -> HTMLResponse:
+        return _render_error_page(request, "crm/register.html", {**base_context, "error": error}, status_code)
     
     # validate email
-    try:
-        email = validate_email(email, check_deliverability=False).normalized
-    except EmailNotValidError:
-        context = {
-            "request": request, 
-            "error": translations.get('invalid_email', 'Invalid email format'),
-            "lang": lang,
-            "supported_languages": supported_languages,
-            "language_urls": language_urls,
-            "t": translations
-        }
-        return templates.TemplateResponse("crm/register.html", add_template_functions(context), status_code=400)
+    email = _normalize_email(email)
+    if email is None:
+        return fail(translations.get('invalid_email', 'Invalid email format'), 400)
 
     # validate password
     if len(password) < 8:
-        context = {
-            "request": request, 
-            "error": translations.get('password_too_short', 'Password must be at least 8 characters'),
-            "lang": lang,
-            "supported_languages": supported_languages,
-            "language_urls": language_urls,
-            "t": translations
-        }
-        return templates.TemplateResponse("crm/register.html", add_template_functions(context), status_code=400)
-    if len(password.encode('utf-8')) > 72:
-        context = {
-            "request": request, 
-            "error": "Password too long (maximum 72 bytes)",
-            "lang": lang,
-            "supported_languages": supported_languages,
-            "language_urls": language_urls,
-            "t": translations
-        }
-        return templates.TemplateResponse("crm/register.html", add_template_functions(context), status_code=400)
+        return fail(translations.get('password_too_short', 'Password must be at least 8 characters'), 400)
+    # Кодируем пароль один раз: те же байты идут в проверку длины и в bcrypt
+    password_bytes = password.encode('utf-8')
+    if len(password_bytes) > 72:
+        return fail("Password too long (maximum 72 bytes)", 400)
     if password != confirm_password:
-        context = {
-            "request": request, 
-            "error": translations.get('passwords_dont_match', 'Passwords do not match'),
-            "lang": lang,
-            "supported_languages": supported_languages,
-            "language_urls": language_urls,
-            "t": translations
-        }
-        return templates.TemplateResponse("crm/register.html", add_template_functions(context), status_code=400)
+        return fail(translations.get('passwords_dont_match', 'Passwords do not match'), 400)
 
     # check unique
     existing = _get_user_by_email(email)
     if existing:
-        context = {
-            "request": request, 
-            "error": translations.get('email_exists', 'User with this email already exists'),
-            "lang": lang,
-            "supported_languages": supported_languages,
-            "language_urls": language_urls,
-            "t": translations
-        }
-        return templates.TemplateResponse("crm/register.html", add_template_functions(context), status_code=400)
+        return fail(translations.get('email_exists', 'User with this email already exists'), 400)
 
     # store bcrypt hash
     try:
-        password_hash = hash_password(password)
+        password_hash = await hash_password_async(password_bytes)
     except Exception as e:
-        import logging
-        logger = logging.getLogger(__name__)
-        logger.error(f"Password hashing failed: {e}")
-        context = {
-            "request": request, 
-            "error": "Password creation error. Try another password.",
-            "lang": lang,
-            "supported_languages": supported_languages,
-            "language_urls": language_urls,
-            "t": translations
-        }
-        return templates.TemplateResponse("crm/register.html", add_template_functions(context), status_code=500)
+        logger.error("Password hashing failed: %s", e)
+        return fail("Password creation error. Try another password.", 500)
     
     try:
         user_id = execute(
@@ -423,16 +418,13 @@ async def register(request: Request, email: str = Form(...), password: str = For
             (email, password_hash, "editor"),
         )
     except Exception as e:
-        context = {
-            "request": request, 
-            "error": f"User creation error: {str(e)}",
-            "lang": lang,
-            "supported_languages": supported_languages,
-            "language_urls": language_urls,
-            "t": translations
-        }
+        # Текст ошибки уникален - рендерим без кэша страниц с ошибками
+        context = {**base_context, "error": f"User creation error: {str(e)}"}
         return templates.TemplateResponse("crm/register.html", add_template_functions(context), status_code=500)
 
+    # Новый пользователь точно существует - избавляем первый запрос к CMS от SELECT
+    user_cache.set(user_id, True)
+
     # auto login
     token = create_access_token(subject=str(user_id), role="editor")
     # Получаем язык из URL для редиректа
@@ -444,7 +436,7 @@ async def register(request: Request, email: str = Form(...), password: str = For
         response=resp,
         key="access_token",
         value=token,
-        max_age=int(os.getenv("JWT_EXPIRES_MINUTES", "15")) * 60,
+        max_age=JWT_EXPIRES_SECONDS,
         httponly=True,
         samesite="lax"
     )
@@ -452,33 +444,14 @@ async def register(request: Request, email: str = Form(...), password: str = For
 
 @router.get("/logout")
 @router.post("/logout")
-async def logout() -> Response:
-    resp = RedirectResponse(url="/login", status_code=302)
-    # Удаляем безопасный cookie
-    delete_secure_cookie(resp, "access_token")
-    return resp
-
-# Языковые роуты для logout
-@router.get("/ru/logout")
-@router.post("/ru/logout")
-async def logout_ru() -> Response:
-    resp = RedirectResponse(url="/ru/login", status_code=302)
-    # Удаляем безопасный cookie
-    delete_secure_cookie(resp, "access_token")
-    return resp
-
-@router.get("/ua/logout")
-@router.post("/ua/logout")
-async def logout_ua() -> Response:
-    resp = RedirectResponse(url="/ua/login", status_code=302)
-    # Удаляем безопасный cookie
-    delete_secure_cookie(resp, "access_token")
-    return resp
-
-@router.get("/en/logout")
-@router.post("/en/logout")
-async def logout_en() -> Response:
-    resp = RedirectResponse(url="/en/login", status_code=302)
+@router.get("/{lang:lang}/logout")
+@router.post("/{lang:lang}/logout")
+async def logout(request: Request) -> Response:
+    lang = request.path_params.get("lang")
+    resp = RedirectResponse(url=f"/{lang}/login" if lang else "/login", status_code=302)
+    token = request.cookies.get("access_token")
+    if token:
+        token_cache.invalidate(token)
     # Удаляем безопасный cookie
     delete_secure_cookie(resp, "access_token")
     return resp
@@ -487,6 +460,11 @@ async def logout_en() -> Response:
 def require_auth(request: Request) -> dict:
     from app.auth.security import decode_token  # lazy import to avoid cycles
 
+    # Для /cms/* токен уже проверен в AuthRedirectMiddleware
+    payload = getattr(request.state, "auth_payload", None)
+    if payload:
+        return payload
+
     token = request.cookies.get("access_token")
     if not token:
         raise HTTPException(status_code=401)
@@ -1,11 +1,22 @@
+import asyncio
+import base64
+import hashlib
+import hmac
+import json
 import os
 import time
-from datetime import datetime, timedelta, timezone
-from typing import Any, Dict, Optional
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Any, Dict, Optional, Union
 
 import jwt
+# pyca/bcrypt начиная с 4.0 - нативное расширение на Rust; отдельная Rust-обертка не нужна
 import bcrypt
 import logging
+from fastapi import HTTPException
+
+from app.database.db import query_one
+from app.utils.cache import token_cache
 
 # Настраиваем логирование для отладки
 logger = logging.getLogger(__name__)
@@ -13,98 +24,272 @@ logger = logging.getLogger(__name__)
 # Используем только bcrypt для хеширования паролей по best practices
 logger.info("Using bcrypt for password hashing")
 
+# Стоимость bcrypt (log2 числа раундов): каждая единица меньше вдвое ускоряет вход и вдвое удешевляет перебор.
+# Существующие хэши хранят свою стоимость и проверяются как раньше.
+# Если BCRYPT_ROUNDS не задан, стоимость подбирается под железо при старте (calibrate_bcrypt_rounds)
+_BCRYPT_ROUNDS_ENV = os.getenv("BCRYPT_ROUNDS")
+BCRYPT_ROUNDS = int(_BCRYPT_ROUNDS_ENV or "12")
+# Целевое время одного хэша для автоподбора и допустимый диапазон стоимости
+BCRYPT_TARGET_MS = int(os.getenv("BCRYPT_TARGET_MS", "300"))
+_BCRYPT_MIN_ROUNDS = 10
+_BCRYPT_MAX_ROUNDS = 14
+
+# Пул для bcrypt: хэширование занимает десятки миллисекунд и не должно блокировать event loop.
+# bcrypt отпускает GIL на время вычислений, поэтому потоки масштабируются по ядрам;
+# размер пула ограничивает число одновременных вычислений при переборе паролей
+BCRYPT_POOL = ThreadPoolExecutor(
+    max_workers=int(os.getenv("BCRYPT_MAX_WORKERS", "0")) or os.cpu_count(),
+    thread_name_prefix="bcrypt",
+)
+
+
+def calibrate_bcrypt_rounds() -> int:
+    """
+    Подобрать наибольшую стоимость bcrypt, при которой хэш занимает не дольше BCRYPT_TARGET_MS.
+    Замеряется один хэш минимальной стоимости: каждая следующая единица удваивает время.
+    Стоимость не опускается ниже стоимости уже хранимых хэшей.
+    Явно заданный BCRYPT_ROUNDS не переопределяется
+    """
+    global BCRYPT_ROUNDS
+    if _BCRYPT_ROUNDS_ENV:
+        return BCRYPT_ROUNDS
+
+    started = time.perf_counter()
+    bcrypt.hashpw(b"calibration", bcrypt.gensalt(rounds=_BCRYPT_MIN_ROUNDS))
+    elapsed_ms = (time.perf_counter() - started) * 1000
+
+    rounds = _BCRYPT_MIN_ROUNDS
+    while rounds < _BCRYPT_MAX_ROUNDS and elapsed_ms * 2 <= BCRYPT_TARGET_MS:
+        elapsed_ms *= 2
+        rounds += 1
+    # Иначе вход по новым хэшам отличался бы по времени от входа по старым и от заглушки
+    stored_rounds = _stored_hash_rounds()
+    if stored_rounds and stored_rounds > rounds:
+        elapsed_ms *= 2 ** (stored_rounds - rounds)
+        rounds = stored_rounds
+    BCRYPT_ROUNDS = rounds
+    logger.info("bcrypt cost calibrated to %d (~%.0f ms per hash)", rounds, elapsed_ms)
+    return rounds
+
 
-def hash_password(plain_password: str) -> str:
-    """Хэширование пароля с использованием bcrypt по best practices"""
+def hash_password(plain_password: Union[str, bytes], rounds: Optional[int] = None) -> str:
+    """Хэширование пароля с использованием bcrypt по best practices (принимает и уже закодированный UTF-8)"""
     try:
-        # bcrypt имеет ограничение в 72 байта для пароля
-        password_bytes = plain_password.encode('utf-8')
-        if len(password_bytes) > 72:
-            password_bytes = password_bytes[:72]
-            logger.info(f"Password truncated to 72 bytes for bcrypt compatibility")
+        # bcrypt имеет ограничение в 72 байта для пароля; срез коротких паролей не меняет
+        password_bytes = (plain_password if isinstance(plain_password, bytes) else plain_password.encode('utf-8'))[:72]
         
         # Генерируем соль и хэшируем пароль с помощью bcrypt
-        salt = bcrypt.gensalt()
-        password_hash = bcrypt.hashpw(password_bytes, salt)
-        
-        result = password_hash.decode('utf-8')
-        logger.info(f"Password hashed successfully with bcrypt: {result[:20]}...")
-        return result
+        salt = bcrypt.gensalt(rounds=rounds or BCRYPT_ROUNDS)
+        return bcrypt.hashpw(password_bytes, salt).decode('utf-8')
         
     except Exception as e:
-        logger.error(f"Error hashing password with bcrypt: {e}")
+        logger.error("Error hashing password with bcrypt: %s", e)
         raise ValueError(f"Failed to hash password: {e}")
 
 
-def verify_password(plain_password: str, password_hash: str) -> bool:
-    """Верификация пароля с использованием bcrypt по best practices"""
+def verify_password(plain_password: Union[str, bytes], password_hash: str) -> bool:
+    """Верификация пароля с использованием bcrypt по best practices (принимает и уже закодированный UTF-8)"""
     try:
-        # bcrypt имеет ограничение в 72 байта для пароля
-        password_bytes = plain_password.encode('utf-8')
-        if len(password_bytes) > 72:
-            password_bytes = password_bytes[:72]
-            logger.info(f"Password truncated to 72 bytes for bcrypt verification")
+        # bcrypt имеет ограничение в 72 байта для пароля; срез коротких паролей не меняет
+        password_bytes = (plain_password if isinstance(plain_password, bytes) else plain_password.encode('utf-8'))[:72]
         
         # Проверяем пароль с помощью bcrypt
-        stored_hash_bytes = password_hash.encode('utf-8')
-        result = bcrypt.checkpw(password_bytes, stored_hash_bytes)
-        
-        logger.info(f"Password verification result: {result}")
+        result = bcrypt.checkpw(password_bytes, password_hash.encode('utf-8'))
+        logger.debug("Password verification result: %s", result)
         return result
         
     except Exception as e:
-        logger.error(f"Error verifying password with bcrypt: {e}")
+        logger.error("Error verifying password with bcrypt: %s", e)
         return False
 
 
+# Стоимость, с которой хранится большинство хэшей: поле NN в "$2b$NN$..."
+_STORED_ROUNDS_SQL = """
+    SELECT substr(password_hash, 5, 2) AS rounds FROM users
+    GROUP BY rounds ORDER BY COUNT(*) DESC LIMIT 1
+"""
+
+
+def _stored_hash_rounds() -> Optional[int]:
+    """Стоимость bcrypt хранимых хэшей паролей (None - пользователей нет или формат не bcrypt)"""
+    row = query_one(_STORED_ROUNDS_SQL)
+    if not row:
+        return None
+    try:
+        rounds = int(row["rounds"])
+    except (TypeError, ValueError):
+        return None
+    return rounds if 4 <= rounds <= 31 else None
+
+
+@lru_cache(maxsize=1)
+def _dummy_password_hash() -> str:
+    """
+    Хэш случайного пароля; вычисляется при первой необходимости.
+    Стоимость берется из хранимых хэшей, а не из BCRYPT_ROUNDS: после смены BCRYPT_ROUNDS
+    старые хэши проверяются со своей стоимостью, и заглушка должна занимать столько же
+    """
+    return hash_password(os.urandom(16).hex(), rounds=_stored_hash_rounds())
+
+
+def verify_dummy_password(plain_password: Union[str, bytes]) -> bool:
+    """
+    Проверка пароля против хэша-заглушки, когда пользователь не найден.
+    Ответ для несуществующего email занимает столько же времени, сколько для неверного пароля,
+    и не позволяет перебирать зарегистрированные адреса по времени ответа
+    """
+    verify_password(plain_password, _dummy_password_hash())
+    return False
+
+
+async def hash_password_async(plain_password: Union[str, bytes]) -> str:
+    """hash_password в пуле BCRYPT_POOL, не блокируя event loop"""
+    return await asyncio.get_running_loop().run_in_executor(BCRYPT_POOL, hash_password, plain_password)
+
+
+async def verify_password_async(plain_password: Union[str, bytes], password_hash: Optional[str]) -> bool:
+    """verify_password в пуле BCRYPT_POOL; без хэша (пользователь не найден) - проверка против заглушки"""
+    loop = asyncio.get_running_loop()
+    if password_hash is None:
+        return await loop.run_in_executor(BCRYPT_POOL, verify_dummy_password, plain_password)
+    return await loop.run_in_executor(BCRYPT_POOL, verify_password, plain_password, password_hash)
+
+
+# Настройки JWT читаются один раз при импорте (.env загружается в main.py до импорта модулей app)
+_JWT_SECRET = os.getenv("JWT_SECRET", "")
+_JWT_ALG = "HS256"
+JWT_EXPIRES_SECONDS = int(os.getenv("JWT_EXPIRES_MINUTES", "15")) * 60
+
+
 def _jwt_secret() -> str:
-    secret = os.getenv("JWT_SECRET")
-    if not secret:
+    # Отсутствие секрета не ломает импорт модуля (скрипты и тесты хэширования), но ломает работу с токенами
+    if not _JWT_SECRET:
         raise ValueError("JWT_SECRET environment variable is required")
-    return secret
+    return _JWT_SECRET
+
+
+def _b64url_encode(data: bytes) -> bytes:
+    """base64url без паддинга, как в JWS"""
+    return base64.urlsafe_b64encode(data).rstrip(b"=")
+
+
+# Заголовок HS256 токена неизменен - сериализуем его один раз (тот же вид, что дает PyJWT)
+_JWT_HEADER_B64 = _b64url_encode(b'{"alg":"HS256","typ":"JWT"}')
+_JWT_KEY = _JWT_SECRET.encode("utf-8")
+# HMAC с уже обработанным ключом (ipad/opad); на каждый токен только copy() вместо повторной подготовки ключа
+_JWT_HMAC = hmac.new(_JWT_KEY, digestmod=hashlib.sha256)
+
+
+def _hs256(signing_input: bytes) -> bytes:
+    """HMAC-SHA256 подпись на основе заранее инициализированного контекста"""
+    mac = _JWT_HMAC.copy()
+    mac.update(signing_input)
+    return mac.digest()
+
+
+# json.dumps с нестандартными аргументами создает новый JSONEncoder на каждый вызов - держим один компактный
+_JSON_ENCODER = json.JSONEncoder(separators=(",", ":"))
+
+
+def _encode_fast(payload: Dict[str, Any]) -> str:
+    """Подписать payload HS256 без разбора алгоритма и сериализации заголовка на каждый вызов"""
+    body = _b64url_encode(_JSON_ENCODER.encode(payload).encode("utf-8"))
+    signing_input = _JWT_HEADER_B64 + b"." + body
+    signature = _b64url_encode(_hs256(signing_input))
+    return (signing_input + b"." + signature).decode("ascii")
 
 
 def create_access_token(subject: str, role: str, expires_minutes: Optional[int] = None) -> str:
-    if expires_minutes is None:
-        expires_minutes = int(os.getenv("JWT_EXPIRES_MINUTES", "15"))
+    _jwt_secret()  # проверяем, что секрет задан
+    expires_seconds = JWT_EXPIRES_SECONDS if expires_minutes is None else expires_minutes * 60
     
-    now = datetime.now(timezone.utc)
+    now = int(time.time())
     payload: Dict[str, Any] = {
         "sub": subject,
         "role": role,
-        "iat": int(now.timestamp()),
-        "exp": int((now + timedelta(minutes=expires_minutes)).timestamp()),
+        "iat": now,
+        "exp": now + expires_seconds,
         "type": "access",
     }
-    return jwt.encode(payload, _jwt_secret(), algorithm="HS256")
+    return _encode_fast(payload)
+
+
+def _b64url_decode(data: bytes) -> bytes:
+    """Декодировать base64url без паддинга"""
+    return base64.urlsafe_b64decode(data + b"=" * (-len(data) % 4))
+
+
+def _decode_fast(token: bytes) -> Optional[Dict[str, Any]]:
+    """Проверить HS256 токен с известным заголовком: один HMAC и compare_digest без обвязки PyJWT"""
+    signing_input, sep, signature = token.rpartition(b".")
+    if not sep:
+        return None
+    expected = _hs256(signing_input)
+    try:
+        if not hmac.compare_digest(expected, _b64url_decode(signature)):
+            return None
+        payload = json.loads(_b64url_decode(signing_input[len(_JWT_HEADER_B64) + 1:]))
+    except ValueError:
+        return None
+    if not isinstance(payload, dict):
+        return None
+
+    # Те же временные проверки, что выполняет jwt.decode
+    now = time.time()
+    exp = payload.get("exp")
+    if exp is not None and (not isinstance(exp, (int, float)) or exp <= now):
+        return None
+    nbf = payload.get("nbf")
+    if nbf is not None and (not isinstance(nbf, (int, float)) or nbf > now):
+        return None
+    return payload
 
 
 def decode_token(token: str) -> Optional[Dict[str, Any]]:
+    secret = _jwt_secret()
+    payload = token_cache.get(token)
+    if payload is not None:
+        return payload
+    payload = _decode_uncached(token, secret)
+    if payload is not None:
+        token_cache.set(token, payload)
+    return payload
+
+
+def _decode_uncached(token: str, secret: str) -> Optional[Dict[str, Any]]:
+    try:
+        raw = token.encode("ascii")
+    except UnicodeEncodeError:
+        return None
+    # Токены, выпущенные create_access_token, проверяем быстрым путем; остальные - через PyJWT
+    if raw.startswith(_JWT_HEADER_B64 + b".") and raw.count(b".") == 2:
+        return _decode_fast(raw)
     try:
-        return jwt.decode(token, _jwt_secret(), algorithms=["HS256"])  # type: ignore[no-any-return]
+        return jwt.decode(token, secret, algorithms=[_JWT_ALG])  # type: ignore[no-any-return]
     except jwt.PyJWTError:
         return None
 
 
 def get_current_user(request) -> Dict[str, Any]:
     """Получить текущего пользователя из JWT токена"""
-    from fastapi import HTTPException
-    from fastapi.responses import RedirectResponse
-    
-    token = request.cookies.get("access_token")
-    if not token:
-        raise HTTPException(status_code=401, detail="Требуется авторизация")
-    
-    payload = decode_token(token)
+    # Payload, уже проверенный в AuthRedirectMiddleware, не декодируем повторно
+    payload = getattr(request.state, "auth_payload", None)
     if not payload:
-        raise HTTPException(status_code=401, detail="Недействительный токен")
+        token = request.cookies.get("access_token")
+        if not token:
+            raise HTTPException(status_code=401, detail="Требуется авторизация")
+        
+        payload = decode_token(token)
+        if not payload:
+            raise HTTPException(status_code=401, detail="Недействительный токен")
     
     # Получаем дополнительную информацию о пользователе из БД
-    from app.database.db import query_one
     user_id = payload.get("sub")
     if not user_id:
         raise HTTPException(status_code=401, detail="Недействительный токен")
     
+    # Строку читаем при каждом запросе: кэш в каждом воркере отдавал бы удаленного
+    # пользователя или снятую роль admin до истечения TTL
     user = query_one("SELECT id, email, role FROM users WHERE id = ?", (user_id,))
     if not user:
         raise HTTPException(status_code=401, detail="Пользователь не найден")
@@ -120,7 +305,6 @@ def require_admin(request) -> Dict[str, Any]:
     """Получить текущего пользователя и проверить, что он администратор"""
     user = get_current_user(request)
     if user["role"] != "admin":
-        from fastapi import HTTPException
         raise HTTPException(status_code=403, detail="Требуются права администратора")
     return user
 
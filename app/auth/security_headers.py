@@ -2,10 +2,104 @@
 Security Headers Middleware для защиты приложения
 """
 import os
+from typing import Dict, FrozenSet, List, Tuple
 from starlette.middleware.base import BaseHTTPMiddleware, RequestResponseEndpoint
 from fastapi import Request, Response
 
 
+# Окружение не меняется за время жизни процесса
+_IS_PRODUCTION = os.getenv("ENVIRONMENT", "development") == "production"
+
+# Content Security Policy
+_CSP_DIRECTIVES = (
+    "default-src 'self'",
+    "script-src 'self' 'unsafe-inline' 'unsafe-eval'",  # unsafe-inline нужен для inline scripts
+    "style-src 'self' 'unsafe-inline'",  # unsafe-inline нужен для Tailwind
+    "img-src 'self' data: blob:",
+    "font-src 'self' data:",
+    "connect-src 'self'",
+    "frame-ancestors 'none'",
+    "base-uri 'self'",
+    "form-action 'self'",
+)
+
+# Permissions-Policy - контроль браузерных фич
+_PERMISSIONS = (
+    "geolocation=()",
+    "microphone=()",
+    "camera=()",
+    "payment=()",
+    "usb=()",
+)
+
+
+def build_security_headers(is_production: bool) -> Dict[str, str]:
+    """Собрать заголовки безопасности (не зависят от запроса, строятся один раз)"""
+    headers = {
+        "Content-Security-Policy": "; ".join(_CSP_DIRECTIVES),
+        # X-Frame-Options - защита от clickjacking
+        "X-Frame-Options": "DENY",
+        # X-Content-Type-Options - предотвращение MIME-sniffing
+        "X-Content-Type-Options": "nosniff",
+        # X-XSS-Protection - дополнительная защита от XSS (legacy браузеры)
+        "X-XSS-Protection": "1; mode=block",
+        # Referrer-Policy - контроль передачи referrer
+        "Referrer-Policy": "strict-origin-when-cross-origin",
+        "Permissions-Policy": ", ".join(_PERMISSIONS),
+    }
+    # Strict-Transport-Security - только для production с HTTPS
+    if is_production:
+        headers["Strict-Transport-Security"] = "max-age=31536000; includeSubDomains"
+    return headers
+
+
+def build_asset_headers(is_production: bool) -> Dict[str, str]:
+    """Заголовки для собственных статических файлов (/static/): CSP и Permissions-Policy для них не имеют смысла"""
+    headers = {"X-Content-Type-Options": "nosniff"}
+    if is_production:
+        headers["Strict-Transport-Security"] = "max-age=31536000; includeSubDomains"
+    return headers
+
+
+def build_upload_headers(is_production: bool) -> Dict[str, str]:
+    """
+    Заголовки для загруженных файлов: полный набор, но CSP запрещает любые ресурсы.
+    Содержимое загружено пользователями, поэтому открытый напрямую файл не должен
+    выполнять скрипты или встраиваться во фреймы
+    """
+    headers = build_security_headers(is_production)
+    headers["Content-Security-Policy"] = "default-src 'none'; frame-ancestors 'none'"
+    return headers
+
+
+# Пути статических файлов и загрузок (StaticFiles смонтированы в main.py)
+_STATIC_PREFIX = "/static/"
+_UPLOADS_PREFIX = "/uploads/"
+# Кэширование успешно отданных файлов браузером: загрузки не кладем в общие кэши прокси
+_ASSET_CACHE_CONTROL = (b"cache-control", b"public, max-age=3600")
+_UPLOAD_CACHE_CONTROL = (b"cache-control", b"private, max-age=3600")
+
+
+def _add_cache_control(response: Response, value: Tuple[bytes, bytes]) -> None:
+    """Добавить Cache-Control к успешному ответу, если обработчик его не выставил"""
+    raw_headers = response.raw_headers
+    if response.status_code in (200, 304) and not any(key == b"cache-control" for key, _ in raw_headers):
+        raw_headers.append(value)
+
+
+def _encode_headers(headers: Dict[str, str]) -> Tuple[List[Tuple[bytes, bytes]], FrozenSet[bytes]]:
+    """Заранее закодированные пары для прямого добавления в raw_headers и множество их имен"""
+    items = [(key.lower().encode("latin-1"), value.encode("latin-1")) for key, value in headers.items()]
+    return items, frozenset(key for key, _ in items)
+
+
+def _apply_headers(raw_headers: List[Tuple[bytes, bytes]], items: List[Tuple[bytes, bytes]], names: FrozenSet[bytes]) -> None:
+    """Добавить заголовки; уже выставленные обработчиком заменяются (как при headers.update)"""
+    if any(key in names for key, _ in raw_headers):
+        raw_headers[:] = [item for item in raw_headers if item[0] not in names]
+    raw_headers.extend(items)
+
+
 class SecurityHeadersMiddleware(BaseHTTPMiddleware):
     """
     Middleware для добавления заголовков безопасности
@@ -13,51 +107,23 @@ class SecurityHeadersMiddleware(BaseHTTPMiddleware):
     
     def __init__(self, app):
         super().__init__(app)
-        self.is_production = os.getenv("ENVIRONMENT", "development") == "production"
+        self.is_production = _IS_PRODUCTION
+        self._page_headers, self._page_header_names = _encode_headers(build_security_headers(self.is_production))
+        self._asset_headers, self._asset_header_names = _encode_headers(build_asset_headers(self.is_production))
+        self._upload_headers, self._upload_header_names = _encode_headers(build_upload_headers(self.is_production))
     
     async def dispatch(self, request: Request, call_next: RequestResponseEndpoint) -> Response:
         response = await call_next(request)
-        
-        # Content Security Policy
-        csp_directives = [
-            "default-src 'self'",
-            "script-src 'self' 'unsafe-inline' 'unsafe-eval'",  # unsafe-inline нужен для inline scripts
-            "style-src 'self' 'unsafe-inline'",  # unsafe-inline нужен для Tailwind
-            "img-src 'self' data: blob:",
-            "font-src 'self' data:",
-            "connect-src 'self'",
-            "frame-ancestors 'none'",
-            "base-uri 'self'",
-            "form-action 'self'",
-        ]
-        response.headers["Content-Security-Policy"] = "; ".join(csp_directives)
-        
-        # X-Frame-Options - защита от clickjacking
-        response.headers["X-Frame-Options"] = "DENY"
-        
-        # X-Content-Type-Options - предотвращение MIME-sniffing
-        response.headers["X-Content-Type-Options"] = "nosniff"
-        
-        # X-XSS-Protection - дополнительная защита от XSS (legacy браузеры)
-        response.headers["X-XSS-Protection"] = "1; mode=block"
-        
-        # Referrer-Policy - контроль передачи referrer
-        response.headers["Referrer-Policy"] = "strict-origin-when-cross-origin"
-        
-        # Permissions-Policy - контроль браузерных фич
-        permissions = [
-            "geolocation=()",
-            "microphone=()",
-            "camera=()",
-            "payment=()",
-            "usb=()",
-        ]
-        response.headers["Permissions-Policy"] = ", ".join(permissions)
-        
-        # Strict-Transport-Security - только для production с HTTPS
-        if self.is_production:
-            response.headers["Strict-Transport-Security"] = "max-age=31536000; includeSubDomains"
-        
+        raw_headers = response.raw_headers
+        path = request.scope["path"]
+        if path.startswith(_STATIC_PREFIX):
+            _apply_headers(raw_headers, self._asset_headers, self._asset_header_names)
+            _add_cache_control(response, _ASSET_CACHE_CONTROL)
+        elif path.startswith(_UPLOADS_PREFIX):
+            _apply_headers(raw_headers, self._upload_headers, self._upload_header_names)
+            _add_cache_control(response, _UPLOAD_CACHE_CONTROL)
+        else:
+            _apply_headers(raw_headers, self._page_headers, self._page_header_names)
         return response
 
 
@@ -80,15 +146,13 @@ def set_secure_cookie(
         httponly: флаг HttpOnly
         samesite: политика SameSite (lax, strict, none)
     """
-    is_production = os.getenv("ENVIRONMENT", "development") == "production"
-    
     response.set_cookie(
         key=key,
         value=value,
         max_age=max_age,
         httponly=httponly,
         samesite=samesite,
-        secure=is_production,  # Secure только в production
+        secure=_IS_PRODUCTION,  # Secure только в production
     )
 
 
@@ -100,12 +164,10 @@ def delete_secure_cookie(response: Response, key: str) -> None:
         response: объект ответа
         key: ключ cookie
     """
-    is_production = os.getenv("ENVIRONMENT", "development") == "production"
-    
     response.delete_cookie(
         key=key,
         httponly=True,
         samesite="lax",
-        secure=is_production,
+        secure=_IS_PRODUCTION,
     )
 
@@ -0,0 +1,39 @@
+"""
+Ограничение размера загрузки изображений до разбора multipart тела
+"""
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.utils.images import MAX_FILE_SIZE
+
+
+# Путь загрузки совпадает для всех языковых префиксов: /cms/... и /{lang}/cms/...
+_UPLOAD_PATH_SUFFIX = "/cms/api/images/upload"
+# Запас на multipart границы, заголовки части и поле image_type
+_MULTIPART_OVERHEAD = 64 * 1024
+MAX_UPLOAD_BODY_SIZE = MAX_FILE_SIZE + _MULTIPART_OVERHEAD
+
+
+class UploadSizeLimitMiddleware:
+    """
+    Чистый ASGI middleware: отклоняет загрузку по Content-Length до чтения тела.
+    FastAPI разбирает форму (и сохраняет файл во временный файл) до вызова обработчика,
+    поэтому проверка размера в upload_image срабатывает уже после приема всех байтов.
+    Запросы без Content-Length (chunked) проходят дальше и проверяются в обработчике
+    """
+
+    def __init__(self, app: ASGIApp, max_body_size: int = MAX_UPLOAD_BODY_SIZE) -> None:
+        self.app = app
+        self.max_body_size = max_body_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "http" and scope["method"] == "POST" and scope["path"].endswith(_UPLOAD_PATH_SUFFIX):
+            content_length = next((value for key, value in scope["headers"] if key == b"content-length"), None)
+            if content_length is not None and content_length.isdigit() and int(content_length) > self.max_body_size:
+                response = JSONResponse(
+                    status_code=413,
+                    content={"success": False, "message": f"Файл слишком большой. Максимальный размер: {MAX_FILE_SIZE // (1024*1024)}MB"}
+                )
+                await response(scope, receive, send)
+                return
+        await self.app(scope, receive, send)
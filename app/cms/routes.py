@@ -1,62 +1,91 @@
 from fastapi import APIRouter, Request, Depends, HTTPException, UploadFile, File, Form
-from fastapi.templating import Jinja2Templates
-from fastapi.responses import JSONResponse, RedirectResponse
-from app.auth.security import get_current_user, create_access_token, decode_token
-from app.database.db import query_one, query_all, execute
-from app.utils.cache import text_cache, image_cache
+from app.utils.templates import create_templates, templates_version
+from fastapi.responses import JSONResponse, RedirectResponse, Response
+from app.auth.security import JWT_EXPIRES_SECONDS, get_current_user, create_access_token, decode_token, hash_password_async
+from app.database.db import query_one, query_all, query_dict, execute, execute_returning, transaction
+from app.utils.cache import text_cache, image_cache, seo_cache, translation_cache, stats_cache, cache_stats_cache, user_cache
 from app.site.middleware import get_language_from_request, get_supported_languages_from_request, get_language_urls_from_request, get_cms_url, get_cms_dashboard_url
 from app.site.config import get_default_language
-from app.site.routes import get_text
+from app.site.routes import get_texts_bulk, get_cached_images
 from app.utils.images import (
-    validate_image_file, optimize_image, save_original_image, 
+    MAX_FILE_SIZE, HEADER_SNIFF_SIZE, check_upload_header, validate_image_file, optimize_image, save_upload_stream,
     generate_unique_filename, get_image_info
 )
 from app.auth.security_headers import set_secure_cookie
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Tuple
+import asyncio
+import hashlib
 import logging
 import json
 import os
 import io
+from pathlib import Path
+import time
 from datetime import datetime, timezone
 
 router = APIRouter(tags=["cms"])
-templates = Jinja2Templates(directory="app/templates")
+templates = create_templates()
+
+# Шаблоны страниц CMS, компилируемые при старте приложения
+_CMS_TEMPLATES = (
+    "crm/dashboard.html", "crm/texts.html", "crm/images.html",
+    "crm/seo.html", "crm/users.html", "crm/template_variables.html"
+)
 
 logger = logging.getLogger(__name__)
 
 
+def preload_templates() -> None:
+    """Скомпилировать шаблоны CMS заранее, чтобы первый запрос не платил за компиляцию"""
+    for template_name in _CMS_TEMPLATES:
+        templates.env.get_template(template_name)
+
+
 def get_current_user_dependency(request: Request) -> Dict[str, Any]:
     """Зависимость для получения текущего пользователя"""
     return get_current_user(request)
 
 
+def require_admin_dependency(current_user: Dict[str, Any] = Depends(get_current_user_dependency)) -> Dict[str, Any]:
+    """Зависимость для разделов только для admin (разрешается один раз за запрос)"""
+    if current_user.get("role") != "admin":
+        raise HTTPException(status_code=403, detail="Доступ запрещен. Требуется роль admin")
+    return current_user
+
+
 # Используем общие функции хеширования из app.auth.security
 
 
+# Количество текстов и список языков собираются за один проход по texts
+_DASHBOARD_STATS_SQL = """
+    SELECT
+        (SELECT COUNT(*) FROM images) AS images_count,
+        (SELECT COUNT(*) FROM users) AS users_count,
+        COUNT(*) AS texts_count,
+        group_concat(DISTINCT lang) AS languages
+    FROM texts
+"""
+
+
 def get_dashboard_stats() -> Dict[str, Any]:
-    """Получить статистику для Dashboard"""
+    """Получить статистику для Dashboard (кэшируется на 30 секунд, сбрасывается при изменениях)"""
+    stats = stats_cache.get()
+    if stats is not None:
+        return stats
     try:
-        # Количество изображений
-        images_count = query_one("SELECT COUNT(*) as count FROM images")["count"]
+        # Все счетчики и активные языки (уникальные языки в таблице texts) одним запросом
+        row = query_one(_DASHBOARD_STATS_SQL)
+        active_languages = row["languages"].split(",") if row["languages"] else []
         
-        # Количество активных языков (уникальные языки в таблице texts)
-        languages = query_all("SELECT DISTINCT lang FROM texts")
-        languages_count = len(languages)
-        active_languages = [lang["lang"] for lang in languages]
-        
-        # Количество текстовых блоков
-        texts_count = query_one("SELECT COUNT(*) as count FROM texts")["count"]
-        
-        # Количество пользователей
-        users_count = query_one("SELECT COUNT(*) as count FROM users")["count"]
-        
-        return {
-            "images_count": images_count,
-            "languages_count": languages_count,
+        stats = {
+            "images_count": row["images_count"],
+            "languages_count": len(active_languages),
             "active_languages": active_languages,
-            "texts_count": texts_count,
-            "users_count": users_count
+            "texts_count": row["texts_count"],
+            "users_count": row["users_count"]
         }
+        stats_cache.set(stats)
+        return stats
     except Exception as e:
         logger.error(f"Ошибка получения статистики: {e}")
         return {
@@ -68,132 +97,166 @@ def get_dashboard_stats() -> Dict[str, Any]:
         }
 
 
+# Ключи переводов страниц CMS
+_DASHBOARD_TRANSLATION_KEYS = (
+    'title', 'welcome', 'logout', 'images', 'languages', 'texts', 'users',
+    'quick_actions', 'edit_texts', 'content_management', 'upload_management',
+    'seo_settings', 'meta_optimization', 'access_management', 
+    'template_variables', 'variable_management'
+)
+_HEADER_TRANSLATION_KEYS = ('theme', 'home')
+_CMS_TEXTS_TRANSLATION_KEYS = (
+    'title', 'subtitle', 'back_to_dashboard', 'page', 'key', 'language', 'value',
+    'actions', 'edit', 'delete', 'save', 'cancel', 'add_text', 'edit_text',
+    'title_tag', 'description', 'cta_text', 'phone', 'address',
+    'home', 'about', 'catalog', 'contacts', 'russian', 'english', 'ukrainian'
+)
+_CMS_IMAGES_TRANSLATION_KEYS = (
+    'title', 'subtitle', 'back_to_dashboard', 'upload_image', 'image_type',
+    'logo', 'slider', 'background', 'favicon', 'order', 'upload',
+    'uploaded_images', 'name', 'type', 'size', 'date', 'actions',
+    'view', 'download', 'delete', 'upload_images', 'select_type', 'image_file',
+    'uploading', 'no_images', 'drag_to_reorder', 'unknown', 'file_too_large',
+    'unsupported_format', 'load_error', 'select_file_and_type', 'upload_success', 
+    'upload_error', 'confirm_delete', 'delete_success', 'delete_error', 'close'
+)
+_CMS_SEO_TRANSLATION_KEYS = (
+    'title', 'subtitle', 'back_to_dashboard', 'page', 'language',
+    'title_tag', 'description', 'keywords', 'save', 'cancel',
+    'add_seo', 'edit_seo', 'seo_settings', 'home', 'about', 'catalog', 'contacts', 
+    'russian', 'english', 'ukrainian', 'title_placeholder', 'description_placeholder', 
+    'keywords_placeholder', 'characters', 'saving', 'preview', 'google_preview', 
+    'enter_title', 'enter_description', 'enter_keywords', 'html_code', 'load_error', 
+    'save_success', 'save_error'
+)
+_CMS_USERS_TRANSLATION_KEYS = (
+    'title', 'subtitle', 'back_to_dashboard', 'add_user', 'system_users',
+    'email', 'role', 'created_date', 'actions', 'password', 'cancel', 'create',
+    'reset_password', 'new_password', 'reset', 'user_created', 'create_error',
+    'password_reset', 'reset_error', 'load_error', 'no_users', 'delete',
+    'confirm_delete', 'user_deleted', 'delete_error'
+)
+_CMS_TEMPLATE_VARIABLES_TRANSLATION_KEYS = (
+    'title', 'subtitle', 'back_to_dashboard', 'template_variables', 'management',
+    'total_pages', 'total_variables', 'missing_variables', 'sync', 'analyze', 'refresh',
+    'sync_variables', 'analyze_templates', 'refresh_data', 'sync_success', 'sync_error',
+    'analysis_success', 'analysis_error', 'load_error', 'no_variables', 'no_templates',
+    'database_variables', 'template_analysis', 'variables_in_db', 'template_analysis_results',
+    'page', 'language', 'variables_count', 'languages_count', 'file', 'variables', 'issues',
+    'problems', 'unclosed_tag', 'invalid_syntax', 'sync_completed', 'analysis_completed',
+    'sync_loading', 'analysis_loading', 'sync_button', 'analyze_button', 'refresh_button',
+    'sync_variables_desc', 'analyze_templates_desc', 'refresh_data_desc'
+)
+
+
+def _get_translations(namespace: str, keys: Tuple[str, ...], lang: str) -> Dict[str, str]:
+    """Получить переводы пространства имен; собранный словарь кэшируется на язык"""
+    translations = translation_cache.get(namespace, lang)
+    if translations is None:
+        translations = get_texts_bulk(namespace, lang, keys)
+        translation_cache.set(namespace, lang, translations)
+    # Вызывающие дополняют словарь переводами Header - отдаем копию, а не запись кэша
+    return dict(translations)
+
+
 def get_dashboard_translations(lang: str) -> Dict[str, str]:
     """Получить переводы для Dashboard"""
-    translations = {}
-    
-    # Список ключей переводов для Dashboard
-    translation_keys = [
-        'title', 'welcome', 'logout', 'images', 'languages', 'texts', 'users',
-        'quick_actions', 'edit_texts', 'content_management', 'upload_management',
-        'seo_settings', 'meta_optimization', 'access_management', 
-        'template_variables', 'variable_management'
-    ]
-    
-    for key in translation_keys:
-        translations[key] = get_text('dashboard', key, lang)
-    
-    return translations
+    return _get_translations('dashboard', _DASHBOARD_TRANSLATION_KEYS, lang)
 
 
 def get_header_translations(lang: str) -> Dict[str, str]:
     """Получить переводы для Header"""
-    translations = {}
-    
-    # Список ключей переводов для Header
-    translation_keys = ['theme', 'home']
-    
-    for key in translation_keys:
-        translations[key] = get_text('header', key, lang)
-    
-    return translations
+    return _get_translations('header', _HEADER_TRANSLATION_KEYS, lang)
 
 
 def get_cms_texts_translations(lang: str) -> Dict[str, str]:
     """Получить переводы для CMS Texts Editor"""
-    translations = {}
-    
-    translation_keys = [
-        'title', 'subtitle', 'back_to_dashboard', 'page', 'key', 'language', 'value',
-        'actions', 'edit', 'delete', 'save', 'cancel', 'add_text', 'edit_text',
-        'title_tag', 'description', 'cta_text', 'phone', 'address',
-        'home', 'about', 'catalog', 'contacts', 'russian', 'english', 'ukrainian'
-    ]
-    
-    for key in translation_keys:
-        translations[key] = get_text('cms_texts', key, lang)
-    
-    return translations
+    return _get_translations('cms_texts', _CMS_TEXTS_TRANSLATION_KEYS, lang)
 
 
 def get_cms_images_translations(lang: str) -> Dict[str, str]:
     """Получить переводы для CMS Images Manager"""
-    translations = {}
-    
-    translation_keys = [
-        'title', 'subtitle', 'back_to_dashboard', 'upload_image', 'image_type',
-        'logo', 'slider', 'background', 'favicon', 'order', 'upload',
-        'uploaded_images', 'name', 'type', 'size', 'date', 'actions',
-        'view', 'download', 'delete', 'upload_images', 'select_type', 'image_file',
-        'uploading', 'no_images', 'drag_to_reorder', 'unknown', 'file_too_large',
-        'unsupported_format', 'load_error', 'select_file_and_type', 'upload_success', 
-        'upload_error', 'confirm_delete', 'delete_success', 'delete_error', 'close'
-    ]
-    
-    for key in translation_keys:
-        translations[key] = get_text('cms_images', key, lang)
-    
-    return translations
+    return _get_translations('cms_images', _CMS_IMAGES_TRANSLATION_KEYS, lang)
 
 
 def get_cms_seo_translations(lang: str) -> Dict[str, str]:
     """Получить переводы для CMS SEO Manager"""
-    translations = {}
-    
-    translation_keys = [
-        'title', 'subtitle', 'back_to_dashboard', 'page', 'language',
-        'title_tag', 'description', 'keywords', 'save', 'cancel',
-        'add_seo', 'edit_seo', 'seo_settings', 'home', 'about', 'catalog', 'contacts', 
-        'russian', 'english', 'ukrainian', 'title_placeholder', 'description_placeholder', 
-        'keywords_placeholder', 'characters', 'saving', 'preview', 'google_preview', 
-        'enter_title', 'enter_description', 'enter_keywords', 'html_code', 'load_error', 
-        'save_success', 'save_error'
-    ]
-    
-    for key in translation_keys:
-        translations[key] = get_text('cms_seo', key, lang)
-    
-    return translations
+    return _get_translations('cms_seo', _CMS_SEO_TRANSLATION_KEYS, lang)
 
 
 def get_cms_users_translations(lang: str) -> Dict[str, str]:
     """Получить переводы для CMS Users Manager"""
-    translations = {}
-    
-    translation_keys = [
-        'title', 'subtitle', 'back_to_dashboard', 'add_user', 'system_users',
-        'email', 'role', 'created_date', 'actions', 'password', 'cancel', 'create',
-        'reset_password', 'new_password', 'reset', 'user_created', 'create_error',
-        'password_reset', 'reset_error', 'load_error', 'no_users', 'delete',
-        'confirm_delete', 'user_deleted', 'delete_error'
-    ]
-    
-    for key in translation_keys:
-        translations[key] = get_text('cms_users', key, lang)
-    
-    return translations
+    return _get_translations('cms_users', _CMS_USERS_TRANSLATION_KEYS, lang)
 
 
 def get_cms_template_variables_translations(lang: str) -> Dict[str, str]:
     """Получить переводы для CMS Template Variables Manager"""
-    translations = {}
-    
-    translation_keys = [
-        'title', 'subtitle', 'back_to_dashboard', 'template_variables', 'management',
-        'total_pages', 'total_variables', 'missing_variables', 'sync', 'analyze', 'refresh',
-        'sync_variables', 'analyze_templates', 'refresh_data', 'sync_success', 'sync_error',
-        'analysis_success', 'analysis_error', 'load_error', 'no_variables', 'no_templates',
-        'database_variables', 'template_analysis', 'variables_in_db', 'template_analysis_results',
-        'page', 'language', 'variables_count', 'languages_count', 'file', 'variables', 'issues',
-        'problems', 'unclosed_tag', 'invalid_syntax', 'sync_completed', 'analysis_completed',
-        'sync_loading', 'analysis_loading', 'sync_button', 'analyze_button', 'refresh_button',
-        'sync_variables_desc', 'analyze_templates_desc', 'refresh_data_desc'
-    ]
-    
-    for key in translation_keys:
-        translations[key] = get_text('cms_template_variables', key, lang)
-    
-    return translations
+    return _get_translations('cms_template_variables', _CMS_TEMPLATE_VARIABLES_TRANSLATION_KEYS, lang)
+
+
+# Допустимые значения параметров API (множества для проверки, строки для сообщений об ошибках)
+_PAGES = ("home", "about", "catalog", "contacts")
+_VALID_PAGES = frozenset(_PAGES)
+_VALID_PAGES_STR = ", ".join(_PAGES)
+_LANGS = ("en", "ua", "ru")
+_VALID_LANGS = frozenset(_LANGS)
+_VALID_LANGS_STR = ", ".join(_LANGS)
+_TEXT_KEYS = ("title", "subtitle", "description", "cta_text", "phone", "address")
+_VALID_TEXT_KEYS = frozenset(_TEXT_KEYS)
+_VALID_TEXT_KEYS_STR = ", ".join(_TEXT_KEYS)
+_IMAGE_TYPES = ("logo", "slider", "background", "favicon")
+_VALID_IMAGE_TYPES = frozenset(_IMAGE_TYPES)
+_VALID_IMAGE_TYPES_STR = ", ".join(_IMAGE_TYPES)
+_VALID_ROLES = frozenset(("admin", "editor"))
+_TRANSLATION_MODULES = ("cms_users", "cms_texts", "cms_images", "cms_seo", "cms_template_variables", "header")
+_VALID_TRANSLATION_MODULES = frozenset(_TRANSLATION_MODULES)
+_VALID_TRANSLATION_MODULES_STR = ", ".join(_TRANSLATION_MODULES)
+# Каталоги загруженных изображений
+_UPLOADS_DIR = "uploads"
+_ORIGINALS_DIR = os.path.join(_UPLOADS_DIR, "originals")
+_OPTIMIZED_DIR = os.path.join(_UPLOADS_DIR, "optimized")
+
+
+def _remove_file(path: str) -> None:
+    """Удалить файл одним unlink() без предварительной проверки существования"""
+    try:
+        Path(path).unlink(missing_ok=True)
+    except OSError as e:
+        logger.warning(f"Ошибка удаления файла {path}: {e}")
+
+
+# Страницы CMS персональные: браузер хранит их только у себя и перепроверяет по ETag
+_CMS_PAGE_CACHE_CONTROL = "private, no-cache"
+# Ключи контекста, которые не влияют на содержимое страницы
+_CMS_PAGE_ETAG_SKIP = frozenset(("request", "get_cms_url", "get_cms_dashboard_url"))
+
+
+def _cms_page_etag(template_name: str, current_user: Dict[str, Any], path: str, context: Dict[str, Any]) -> str:
+    """Слабый ETag страницы CMS: шаблон, его версия, пользователь, путь и данные контекста"""
+    data = {key: value for key, value in context.items() if key not in _CMS_PAGE_ETAG_SKIP}
+    digest = hashlib.blake2b(digest_size=8)
+    digest.update(f"{template_name}:{templates_version()}:{current_user.get('id')}:{path}:".encode("utf-8"))
+    digest.update(json.dumps(data, sort_keys=True, ensure_ascii=False, default=str).encode("utf-8"))
+    return f'W/"{digest.hexdigest()}"'
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    """Слабое сравнение ETag со значением заголовка If-None-Match"""
+    opaque = etag[2:]
+    return any(
+        candidate.strip().removeprefix("W/") == opaque
+        for candidate in if_none_match.split(",")
+    )
+
+
+def _render_cms_page(request: Request, current_user: Dict[str, Any], template_name: str, context: Dict[str, Any]) -> Response:
+    """Отрендерить страницу CMS или ответить 304, если у браузера актуальная версия"""
+    etag = _cms_page_etag(template_name, current_user, request.url.path, context)
+    headers = {"ETag": etag, "Cache-Control": _CMS_PAGE_CACHE_CONTROL}
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and _etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    return templates.TemplateResponse(template_name, context, headers=headers)
 
 
 @router.get("/")
@@ -226,7 +289,9 @@ async def dashboard(request: Request, current_user: Dict[str, Any] = Depends(get
         header_translations = get_header_translations(lang)
         translations.update(header_translations)
         
-        return templates.TemplateResponse(
+        return _render_cms_page(
+            request,
+            current_user,
             "crm/dashboard.html",
             {
                 "request": request,
@@ -259,7 +324,9 @@ async def texts_editor(request: Request, current_user: Dict[str, Any] = Depends(
     header_translations = get_header_translations(lang)
     translations.update(header_translations)
     
-    return templates.TemplateResponse(
+    return _render_cms_page(
+        request,
+        current_user,
         "crm/texts.html",
         {
             "request": request,
@@ -287,7 +354,9 @@ async def images_manager(request: Request, current_user: Dict[str, Any] = Depend
     header_translations = get_header_translations(lang)
     translations.update(header_translations)
     
-    return templates.TemplateResponse(
+    return _render_cms_page(
+        request,
+        current_user,
         "crm/images.html",
         {
             "request": request,
@@ -315,7 +384,9 @@ async def seo_manager(request: Request, current_user: Dict[str, Any] = Depends(g
     header_translations = get_header_translations(lang)
     translations.update(header_translations)
     
-    return templates.TemplateResponse(
+    return _render_cms_page(
+        request,
+        current_user,
         "crm/seo.html",
         {
             "request": request,
@@ -331,12 +402,8 @@ async def seo_manager(request: Request, current_user: Dict[str, Any] = Depends(g
 
 
 @router.get("/users")
-async def users_manager(request: Request, current_user: Dict[str, Any] = Depends(get_current_user_dependency)):
+async def users_manager(request: Request, current_user: Dict[str, Any] = Depends(require_admin_dependency)):
     """Управление пользователями (только для admin)"""
-    user_role = current_user.get("role", "editor")
-    if user_role != "admin":
-        raise HTTPException(status_code=403, detail="Доступ запрещен. Требуется роль admin")
-    
     lang = get_language_from_request(request)
     supported_languages = get_supported_languages_from_request(request)
     language_urls = get_language_urls_from_request(request)
@@ -346,7 +413,9 @@ async def users_manager(request: Request, current_user: Dict[str, Any] = Depends
     header_translations = get_header_translations(lang)
     translations.update(header_translations)
     
-    return templates.TemplateResponse(
+    return _render_cms_page(
+        request,
+        current_user,
         "crm/users.html",
         {
             "request": request,
@@ -397,31 +466,30 @@ async def template_variables_manager(request: Request, current_user: Dict[str, A
 
 
 # API для работы с текстами
+# GET обработчики API возвращают JSONResponse напрямую: строки из SQLite уже содержат
+# только JSON-совместимые типы, и рекурсивный обход jsonable_encoder для них не нужен
 @router.get("/api/texts")
 async def get_texts(page: str, lang: str, current_user: Dict[str, Any] = Depends(get_current_user_dependency)):
     """Получить тексты для указанной страницы и языка"""
     try:
         # Валидация параметров
-        valid_pages = ["home", "about", "catalog", "contacts"]
-        valid_langs = ["en", "ua", "ru"]
-        
-        if page not in valid_pages:
-            return {"success": False, "message": f"Недопустимая страница. Доступные: {', '.join(valid_pages)}"}
+        if page not in _VALID_PAGES:
+            return {"success": False, "message": f"Недопустимая страница. Доступные: {_VALID_PAGES_STR}"}
         
-        if lang not in valid_langs:
-            return {"success": False, "message": f"Недопустимый язык. Доступные: {', '.join(valid_langs)}"}
+        if lang not in _VALID_LANGS:
+            return {"success": False, "message": f"Недопустимый язык. Доступные: {_VALID_LANGS_STR}"}
         
         # Проверяем кэш
         cached_texts = text_cache.get(page, lang)
         if cached_texts is not None:
             logger.debug(f"Cache hit for {page}:{lang}")
-            return {
+            return JSONResponse(content={
                 "success": True,
                 "texts": cached_texts,
                 "page": page,
                 "lang": lang,
                 "cached": True
-            }
+            })
         
         # Получаем из БД
         texts_query = """
@@ -429,30 +497,31 @@ async def get_texts(page: str, lang: str, current_user: Dict[str, Any] = Depends
             FROM texts 
             WHERE page = ? AND lang = ?
         """
-        results = query_all(texts_query, (page, lang))
-        
-        # Преобразуем в словарь
-        texts = {}
-        for row in results:
-            texts[row["key"]] = row["value"]
+        texts = query_dict(texts_query, (page, lang))
         
         # Сохраняем в кэш
         text_cache.set(page, lang, texts)
         logger.debug(f"Cache set for {page}:{lang}")
         
-        return {
+        return JSONResponse(content={
             "success": True,
             "texts": texts,
             "page": page,
             "lang": lang,
             "cached": False
-        }
+        })
         
     except Exception as e:
         logger.error(f"Ошибка получения текстов: {e}")
         return {"success": False, "message": "Ошибка получения текстов"}
 
 
+_UPSERT_TEXT_SQL = """
+    INSERT INTO texts (page, key, lang, value) VALUES (?, ?, ?, ?)
+    ON CONFLICT(page, key, lang) DO UPDATE SET value = excluded.value
+"""
+
+
 @router.post("/api/texts")
 async def save_texts(request: Request, current_user: Dict[str, Any] = Depends(get_current_user_dependency)):
     """Сохранить тексты для указанной страницы и языка"""
@@ -464,54 +533,36 @@ async def save_texts(request: Request, current_user: Dict[str, Any] = Depends(ge
         texts = data.get("texts", {})
         
         # Валидация параметров
-        valid_pages = ["home", "about", "catalog", "contacts"]
-        valid_langs = ["en", "ua", "ru"]
+        if not page or page not in _VALID_PAGES:
+            return {"success": False, "message": f"Недопустимая страница. Доступные: {_VALID_PAGES_STR}"}
         
-        if not page or page not in valid_pages:
-            return {"success": False, "message": f"Недопустимая страница. Доступные: {', '.join(valid_pages)}"}
-        
-        if not lang or lang not in valid_langs:
-            return {"success": False, "message": f"Недопустимый язык. Доступные: {', '.join(valid_langs)}"}
+        if not lang or lang not in _VALID_LANGS:
+            return {"success": False, "message": f"Недопустимый язык. Доступные: {_VALID_LANGS_STR}"}
         
         if not isinstance(texts, dict):
             return {"success": False, "message": "Тексты должны быть объектом"}
         
-        # Валидация ключей текстов
-        valid_keys = ["title", "subtitle", "description", "cta_text", "phone", "address"]
-        for key in texts.keys():
-            if key not in valid_keys:
-                return {"success": False, "message": f"Недопустимый ключ текста: {key}. Доступные: {', '.join(valid_keys)}"}
-        
-        # Сохраняем каждый текст через UPSERT
-        for key, value in texts.items():
-            if value:  # Сохраняем только непустые значения
-                # Проверяем, существует ли запись
-                existing = query_one(
-                    "SELECT id FROM texts WHERE page = ? AND key = ? AND lang = ?",
-                    (page, key, lang)
+        # Валидация ключей текстов: разность множеств вычисляется на стороне C
+        invalid_keys = texts.keys() - _VALID_TEXT_KEYS
+        if invalid_keys:
+            key = next(iter(invalid_keys))
+            return {"success": False, "message": f"Недопустимый ключ текста: {key}. Доступные: {_VALID_TEXT_KEYS_STR}"}
+        
+        # Непустые значения сохраняем одним UPSERT, пустые удаляем одним DELETE - в одной транзакции
+        rows = [(page, key, lang, str(value)) for key, value in texts.items() if value]
+        empty_keys = [key for key in _TEXT_KEYS if not texts.get(key)]
+        with transaction() as conn:
+            if rows:
+                conn.executemany(_UPSERT_TEXT_SQL, rows)
+            if empty_keys:
+                conn.execute(
+                    f"DELETE FROM texts WHERE page = ? AND lang = ? AND key IN ({', '.join('?' * len(empty_keys))})",
+                    (page, lang, *empty_keys)
                 )
-                
-                if existing:
-                    # Обновляем существующую запись
-                    execute(
-                        "UPDATE texts SET value = ? WHERE page = ? AND key = ? AND lang = ?",
-                        (str(value), page, key, lang)
-                    )
-                else:
-                    # Создаем новую запись
-                    execute(
-                        "INSERT INTO texts (page, key, lang, value) VALUES (?, ?, ?, ?)",
-                        (page, key, lang, str(value))
-                    )
-        
-        # Удаляем пустые значения из БД
-        for key in valid_keys:
-            if key not in texts or not texts[key]:
-                delete_query = "DELETE FROM texts WHERE page = ? AND key = ? AND lang = ?"
-                execute(delete_query, (page, key, lang))
         
         # Инвалидируем кэш для этой страницы и языка
         text_cache.invalidate(page, lang)
+        stats_cache.clear()
         logger.debug(f"Cache invalidated for {page}:{lang}")
         
         return {
@@ -530,7 +581,11 @@ async def save_texts(request: Request, current_user: Dict[str, Any] = Depends(ge
 async def get_cache_stats(current_user: Dict[str, Any] = Depends(get_current_user_dependency)):
     """Получить статистику кэша (для отладки)"""
     try:
-        stats = text_cache.get_stats()
+        # Обход кэша текстов не повторяем при частом опросе со страницы
+        stats = cache_stats_cache.get()
+        if stats is None:
+            stats = text_cache.get_stats()
+            cache_stats_cache.set(stats)
         return {
             "success": True,
             "cache_stats": stats
@@ -545,6 +600,10 @@ async def clear_cache(current_user: Dict[str, Any] = Depends(get_current_user_de
     """Очистить кэш (для отладки)"""
     try:
         text_cache.clear()
+        seo_cache.clear()
+        translation_cache.clear()
+        stats_cache.clear()
+        cache_stats_cache.clear()
         logger.info("Cache cleared by user request")
         return {
             "success": True,
@@ -600,10 +659,10 @@ async def get_images(request: Request, user: Dict[str, Any] = Depends(get_curren
             ORDER BY type, "order"
         """)
         
-        return {
+        return JSONResponse(content={
             "success": True,
             "images": images
-        }
+        })
     except Exception as e:
         logger.error(f"Ошибка получения списка изображений: {e}")
         return {"success": False, "message": "Ошибка получения списка изображений"}
@@ -635,23 +694,25 @@ async def upload_image(
             )
         
         # Проверка типа изображения
-        valid_types = ['logo', 'slider', 'background', 'favicon']
-        if image_type not in valid_types:
+        if image_type not in _VALID_IMAGE_TYPES:
             return JSONResponse(
                 status_code=400,
-                content={"success": False, "message": f"Недопустимый тип изображения. Разрешены: {', '.join(valid_types)}"}
+                content={"success": False, "message": f"Недопустимый тип изображения. Разрешены: {_VALID_IMAGE_TYPES_STR}"}
             )
         
-        # Читаем содержимое файла
-        file_content = await file.read()
-        logger.info(f"Файл прочитан, размер: {len(file_content)} байт, MIME: {file.content_type}")
+        # Отказ по размеру до обработки: тело формы уже разобрано starlette во временный файл
+        logger.info(f"Файл получен, размер: {file.size} байт, MIME: {file.content_type}")
+        if file.size is not None and file.size > MAX_FILE_SIZE:
+            return JSONResponse(
+                status_code=400,
+                content={"success": False, "message": f"Файл слишком большой. Максимальный размер: {MAX_FILE_SIZE // (1024*1024)}MB"}
+            )
         
-        # Валидация файла
-        is_valid, error_message = validate_image_file(
-            file_content, file.filename, file.content_type
-        )
-        logger.info(f"Результат валидации: {is_valid}, сообщение: {error_message}")
+        # Расширение, MIME и сигнатуру проверяем по первым байтам - неподходящий файл не копируется на диск
+        head = await file.read(HEADER_SNIFF_SIZE)
+        is_valid, error_message = check_upload_header(head, file.filename, file.content_type)
         if not is_valid:
+            logger.info(f"Загрузка отклонена по заголовку файла: {error_message}")
             return JSONResponse(
                 status_code=400,
                 content={"success": False, "message": error_message}
@@ -660,53 +721,58 @@ async def upload_image(
         # Генерируем уникальное имя файла
         unique_filename = generate_unique_filename(file.filename)
         
-        # Пути для сохранения
-        uploads_dir = "uploads"
-        originals_dir = os.path.join(uploads_dir, "originals")
-        optimized_dir = os.path.join(uploads_dir, "optimized")
-        
-        original_path = os.path.join(originals_dir, unique_filename)
-        optimized_path = os.path.join(optimized_dir, unique_filename.replace(os.path.splitext(unique_filename)[1], '.webp'))
+        # Пути для сохранения: у оптимизированной копии меняется только расширение
+        stem, _ext = os.path.splitext(unique_filename)
+        original_path = os.path.join(_ORIGINALS_DIR, unique_filename)
+        optimized_path = os.path.join(_OPTIMIZED_DIR, stem + ".webp")
         
-        # Сохраняем оригинальное изображение
-        if not save_original_image(file_content, original_path):
+        # Оригинал копируем на диск блоками, не читая файл целиком в память;
+        # валидация и оптимизация дальше открывают сохраненный файл (PIL читает его лениво)
+        if not await asyncio.to_thread(save_upload_stream, file.file, original_path):
             return JSONResponse(
                 status_code=500,
                 content={"success": False, "message": "Ошибка сохранения оригинального изображения"}
             )
         
-        # Оптимизируем изображение
-        if not optimize_image(file_content, optimized_path):
+        # Валидация файла (PIL verify - CPU работа, выполняем вне event loop)
+        is_valid, error_message = await asyncio.to_thread(
+            validate_image_file, original_path, file.filename, file.content_type
+        )
+        logger.info(f"Результат валидации: {is_valid}, сообщение: {error_message}")
+        if not is_valid:
+            await asyncio.to_thread(_remove_file, original_path)
+            return JSONResponse(
+                status_code=400,
+                content={"success": False, "message": error_message}
+            )
+        
+        # WebP оптимизация и чтение метаданных независимы - выполняем параллельно
+        # в потоках (PIL отпускает GIL при кодировании), не блокируя event loop
+        optimized, image_info = await asyncio.gather(
+            asyncio.to_thread(optimize_image, original_path, optimized_path),
+            asyncio.to_thread(get_image_info, original_path),
+        )
+        
+        if not optimized:
             # Удаляем оригинал если оптимизация не удалась
-            try:
-                os.remove(original_path)
-            except:
-                pass
+            await asyncio.to_thread(_remove_file, original_path)
             return JSONResponse(
                 status_code=500,
                 content={"success": False, "message": "Ошибка оптимизации изображения"}
             )
         
-        # Получаем информацию об изображении
-        image_info = get_image_info(file_content)
-        
-        # Получаем следующий порядок для данного типа
-        next_order = query_one(
-            "SELECT COALESCE(MAX(\"order\"), 0) + 1 as next_order FROM images WHERE type = ?",
-            (image_type,)
-        )["next_order"]
-        
-        # Сохраняем информацию в БД
-        execute("""
+        # Сохраняем информацию в БД: порядок (следующий для данного типа) и ID получаем тем же выражением
+        created = execute_returning("""
             INSERT INTO images (name, path, original_path, type, "order")
-            VALUES (?, ?, ?, ?, ?)
-        """, (unique_filename, optimized_path, original_path, image_type, next_order))
-        
-        # Получаем ID созданной записи
-        image_id = query_one("SELECT last_insert_rowid() as id")["id"]
+            VALUES (?, ?, ?, ?, (SELECT COALESCE(MAX("order"), 0) + 1 FROM images WHERE type = ?))
+            RETURNING id, "order"
+        """, (unique_filename, optimized_path, original_path, image_type, image_type))
+        image_id = created["id"]
+        next_order = created["order"]
         
         # Инвалидируем кэш изображений для данного типа
         image_cache.invalidate_type(image_type)
+        stats_cache.clear()
         
         logger.info(f"Изображение загружено: {unique_filename}, тип: {image_type}")
         
@@ -742,28 +808,26 @@ async def delete_image(
 ):
     """Удалить изображение"""
     try:
-        # Получаем информацию об изображении
-        image = query_one("SELECT * FROM images WHERE id = ?", (image_id,))
+        # Удаляем запись из БД и сразу получаем пути к файлам (без отдельного SELECT)
+        image = execute_returning(
+            "DELETE FROM images WHERE id = ? RETURNING name, path, original_path, type",
+            (image_id,)
+        )
         if not image:
             return JSONResponse(
                 status_code=404,
                 content={"success": False, "message": "Изображение не найдено"}
             )
         
-        # Удаляем файлы
-        try:
-            if os.path.exists(image["path"]):
-                os.remove(image["path"])
-            if os.path.exists(image["original_path"]):
-                os.remove(image["original_path"])
-        except Exception as e:
-            logger.warning(f"Ошибка удаления файлов изображения {image_id}: {e}")
-        
-        # Удаляем запись из БД
-        execute("DELETE FROM images WHERE id = ?", (image_id,))
+        # Удаляем оба файла параллельно вне event loop
+        await asyncio.gather(
+            asyncio.to_thread(_remove_file, image["path"]),
+            asyncio.to_thread(_remove_file, image["original_path"]),
+        )
         
         # Инвалидируем кэш изображений для данного типа
         image_cache.invalidate_type(image["type"])
+        stats_cache.clear()
         
         logger.info(f"Изображение удалено: {image['name']}")
         
@@ -789,16 +853,19 @@ async def update_image_order(
 ):
     """Обновить порядок изображения"""
     try:
-        # Проверяем существование изображения
-        image = query_one("SELECT * FROM images WHERE id = ?", (image_id,))
+        # Обновляем порядок; RETURNING заменяет предварительную проверку существования
+        image = execute_returning(
+            "UPDATE images SET \"order\" = ? WHERE id = ? RETURNING type",
+            (new_order, image_id)
+        )
         if not image:
             return JSONResponse(
                 status_code=404,
                 content={"success": False, "message": "Изображение не найдено"}
             )
         
-        # Обновляем порядок
-        execute("UPDATE images SET \"order\" = ? WHERE id = ?", (new_order, image_id))
+        # Порядок влияет на выдачу изображений этого типа
+        image_cache.invalidate_type(image["type"])
         
         logger.info(f"Порядок изображения {image_id} обновлен на {new_order}")
         
@@ -823,24 +890,18 @@ async def get_images_by_type(
 ):
     """Получить изображения по типу"""
     try:
-        valid_types = ['logo', 'slider', 'background', 'favicon']
-        if image_type not in valid_types:
+        if image_type not in _VALID_IMAGE_TYPES:
             return JSONResponse(
                 status_code=400,
-                content={"success": False, "message": f"Недопустимый тип изображения. Разрешены: {', '.join(valid_types)}"}
+                content={"success": False, "message": f"Недопустимый тип изображения. Разрешены: {_VALID_IMAGE_TYPES_STR}"}
             )
         
-        images = query_all("""
-            SELECT id, name, path, original_path, type, "order"
-            FROM images 
-            WHERE type = ? 
-            ORDER BY "order"
-        """, (image_type,))
+        images = get_cached_images(image_type)
         
-        return {
+        return JSONResponse(content={
             "success": True,
             "images": images
-        }
+        })
         
     except Exception as e:
         logger.error(f"Ошибка получения изображений по типу: {e}")
@@ -857,37 +918,38 @@ async def get_seo(page: str, lang: str, current_user: Dict[str, Any] = Depends(g
     """Получить SEO данные для указанной страницы и языка"""
     try:
         # Валидация параметров
-        valid_pages = ["home", "about", "catalog", "contacts"]
-        valid_langs = ["en", "ua", "ru"]
-        
-        if page not in valid_pages:
-            return {"success": False, "message": f"Недопустимая страница. Доступные: {', '.join(valid_pages)}"}
-        
-        if lang not in valid_langs:
-            return {"success": False, "message": f"Недопустимый язык. Доступные: {', '.join(valid_langs)}"}
-        
-        # Получаем SEO данные из БД
-        seo_query = """
-            SELECT title, description, keywords 
-            FROM seo 
-            WHERE page = ? AND lang = ?
-        """
-        seo_data = query_one(seo_query, (page, lang))
-        
-        # Если данных нет, возвращаем пустые значения
-        if not seo_data:
-            seo_data = {
-                "title": "",
-                "description": "",
-                "keywords": ""
-            }
+        if page not in _VALID_PAGES:
+            return {"success": False, "message": f"Недопустимая страница. Доступные: {_VALID_PAGES_STR}"}
+        
+        if lang not in _VALID_LANGS:
+            return {"success": False, "message": f"Недопустимый язык. Доступные: {_VALID_LANGS_STR}"}
+        
+        # Сначала проверяем кэш
+        seo_data = seo_cache.get(page, lang)
+        if seo_data is None:
+            # Получаем SEO данные из БД
+            seo_query = """
+                SELECT title, description, keywords 
+                FROM seo 
+                WHERE page = ? AND lang = ?
+            """
+            seo_data = query_one(seo_query, (page, lang))
+            
+            # Если данных нет, возвращаем пустые значения
+            if not seo_data:
+                seo_data = {
+                    "title": "",
+                    "description": "",
+                    "keywords": ""
+                }
+            seo_cache.set(page, lang, seo_data)
         
-        return {
+        return JSONResponse(content={
             "success": True,
             "seo": seo_data,
             "page": page,
             "lang": lang
-        }
+        })
         
     except Exception as e:
         logger.error(f"Ошибка получения SEO данных: {e}")
@@ -905,14 +967,11 @@ async def save_seo(request: Request, current_user: Dict[str, Any] = Depends(get_
         seo_data = data.get("seo", {})
         
         # Валидация параметров
-        valid_pages = ["home", "about", "catalog", "contacts"]
-        valid_langs = ["en", "ua", "ru"]
+        if not page or page not in _VALID_PAGES:
+            return {"success": False, "message": f"Недопустимая страница. Доступные: {_VALID_PAGES_STR}"}
         
-        if not page or page not in valid_pages:
-            return {"success": False, "message": f"Недопустимая страница. Доступные: {', '.join(valid_pages)}"}
-        
-        if not lang or lang not in valid_langs:
-            return {"success": False, "message": f"Недопустимый язык. Доступные: {', '.join(valid_langs)}"}
+        if not lang or lang not in _VALID_LANGS:
+            return {"success": False, "message": f"Недопустимый язык. Доступные: {_VALID_LANGS_STR}"}
         
         if not isinstance(seo_data, dict):
             return {"success": False, "message": "SEO данные должны быть объектом"}
@@ -932,25 +991,18 @@ async def save_seo(request: Request, current_user: Dict[str, Any] = Depends(get_
         if keywords and len(keywords) > 255:
             return {"success": False, "message": "Keywords не должны превышать 255 символов"}
         
-        # Проверяем, существует ли запись
-        existing = query_one(
-            "SELECT id FROM seo WHERE page = ? AND lang = ?",
-            (page, lang)
-        )
+        # Одно атомарное выражение вместо SELECT + UPDATE/INSERT (UNIQUE(page, lang))
+        execute("""
+            INSERT INTO seo (page, lang, title, description, keywords)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT(page, lang) DO UPDATE SET
+                title = excluded.title,
+                description = excluded.description,
+                keywords = excluded.keywords
+        """, (page, lang, title, description, keywords))
         
-        if existing:
-            # Обновляем существующую запись
-            execute("""
-                UPDATE seo 
-                SET title = ?, description = ?, keywords = ?
-                WHERE page = ? AND lang = ?
-            """, (title, description, keywords, page, lang))
-        else:
-            # Создаем новую запись
-            execute("""
-                INSERT INTO seo (page, lang, title, description, keywords)
-                VALUES (?, ?, ?, ?, ?)
-            """, (page, lang, title, description, keywords))
+        # Инвалидируем кэш для этой страницы и языка
+        seo_cache.invalidate(page, lang)
         
         logger.info(f"SEO данные сохранены для {page}:{lang}")
         
@@ -969,13 +1021,9 @@ async def save_seo(request: Request, current_user: Dict[str, Any] = Depends(get_
 # ==================== УПРАВЛЕНИЕ ПОЛЬЗОВАТЕЛЯМИ ====================
 
 @router.get("/api/users")
-async def get_users(current_user: Dict[str, Any] = Depends(get_current_user_dependency)):
+async def get_users(current_user: Dict[str, Any] = Depends(require_admin_dependency)):
     """Получить список всех пользователей (только для admin)"""
     try:
-        # Проверяем роль пользователя
-        if current_user.get("role") != "admin":
-            raise HTTPException(status_code=403, detail="Доступ запрещен")
-        
         # Получаем список пользователей
         users = query_all("""
             SELECT id, email, role, created_at 
@@ -983,10 +1031,10 @@ async def get_users(current_user: Dict[str, Any] = Depends(get_current_user_depe
             ORDER BY created_at DESC
         """)
         
-        return {
+        return JSONResponse(content={
             "success": True,
             "users": users
-        }
+        })
         
     except HTTPException:
         raise
@@ -995,19 +1043,20 @@ async def get_users(current_user: Dict[str, Any] = Depends(get_current_user_depe
         return {"success": False, "message": "Ошибка получения списка пользователей"}
 
 
+def _utf8_length(value: str) -> int:
+    """Длина строки в байтах UTF-8 без кодирования для ASCII строк"""
+    return len(value) if value.isascii() else len(value.encode('utf-8'))
+
+
 @router.post("/api/users")
 async def create_user(
     email: str = Form(...),
     password: str = Form(...),
     role: str = Form(...),
-    current_user: Dict[str, Any] = Depends(get_current_user_dependency)
+    current_user: Dict[str, Any] = Depends(require_admin_dependency)
 ):
     """Создать нового пользователя (только для admin)"""
     try:
-        # Проверяем роль пользователя
-        if current_user.get("role") != "admin":
-            raise HTTPException(status_code=403, detail="Доступ запрещен")
-        
         # Валидация данных
         if not email or len(email) < 5:
             return {"success": False, "message": "Некорректный email"}
@@ -1015,10 +1064,10 @@ async def create_user(
         if not password or len(password) < 8:
             return {"success": False, "message": "Пароль должен содержать минимум 8 символов"}
         
-        if len(password.encode('utf-8')) > 72:
+        if _utf8_length(password) > 72:
             return {"success": False, "message": "Пароль не может быть длиннее 72 байтов"}
         
-        if role not in ["admin", "editor"]:
+        if role not in _VALID_ROLES:
             return {"success": False, "message": "Некорректная роль"}
         
         # Проверяем, что пользователь с таким email не существует
@@ -1027,13 +1076,17 @@ async def create_user(
             return {"success": False, "message": "Пользователь с таким email уже существует"}
         
         # Хэшируем пароль с помощью bcrypt
-        password_hash = hash_password(password)
+        # bcrypt выполняется в пуле, чтобы не блокировать event loop
+        password_hash = await hash_password_async(password)
         
-        # Создаем пользователя
-        execute("""
+        # Создаем пользователя; execute возвращает lastrowid без отдельного SELECT
+        user_id = execute("""
             INSERT INTO users (email, password_hash, role, created_at)
             VALUES (?, ?, ?, datetime('now'))
         """, (email, password_hash, role))
+        # Новый пользователь точно существует - избавляем его первый запрос к CMS от SELECT
+        user_cache.set(user_id, True)
+        stats_cache.clear()
         
         return {"success": True, "message": "Пользователь успешно создан"}
         
@@ -1047,14 +1100,10 @@ async def create_user(
 @router.delete("/api/users/{user_id}")
 async def delete_user(
     user_id: int,
-    current_user: Dict[str, Any] = Depends(get_current_user_dependency)
+    current_user: Dict[str, Any] = Depends(require_admin_dependency)
 ):
     """Удалить пользователя (только для admin)"""
     try:
-        # Проверяем роль пользователя
-        if current_user.get("role") != "admin":
-            raise HTTPException(status_code=403, detail="Доступ запрещен")
-        
         # Проверяем, что пользователь существует
         user = query_one("SELECT id, email FROM users WHERE id = ?", (user_id,))
         if not user:
@@ -1066,6 +1115,8 @@ async def delete_user(
         
         # Удаляем пользователя
         execute("DELETE FROM users WHERE id = ?", (user_id,))
+        user_cache.invalidate(user_id)
+        stats_cache.clear()
         
         return {"success": True, "message": "Пользователь успешно удален"}
         
@@ -1080,19 +1131,15 @@ async def delete_user(
 async def reset_user_password(
     user_id: int,
     new_password: str = Form(...),
-    current_user: Dict[str, Any] = Depends(get_current_user_dependency)
+    current_user: Dict[str, Any] = Depends(require_admin_dependency)
 ):
     """Сбросить пароль пользователя (только для admin)"""
     try:
-        # Проверяем роль пользователя
-        if current_user.get("role") != "admin":
-            raise HTTPException(status_code=403, detail="Доступ запрещен")
-        
         # Валидация пароля
         if not new_password or len(new_password) < 8:
             return {"success": False, "message": "Пароль должен содержать минимум 8 символов"}
         
-        if len(new_password.encode('utf-8')) > 72:
+        if _utf8_length(new_password) > 72:
             return {"success": False, "message": "Пароль не может быть длиннее 72 байтов"}
         
         # Проверяем, что пользователь существует
@@ -1101,7 +1148,8 @@ async def reset_user_password(
             return {"success": False, "message": "Пользователь не найден"}
         
         # Хэшируем новый пароль с помощью bcrypt
-        password_hash = hash_password(new_password)
+        # bcrypt выполняется в пуле, чтобы не блокировать event loop
+        password_hash = await hash_password_async(new_password)
         
         # Обновляем пароль
         execute("UPDATE users SET password_hash = ? WHERE id = ?", (password_hash, user_id))
@@ -1132,7 +1180,7 @@ async def check_session(request: Request):
         # Проверяем истечение
         exp_timestamp = payload.get("exp")
         if exp_timestamp:
-            current_time = datetime.now(timezone.utc).timestamp()
+            current_time = time.time()
             if current_time >= exp_timestamp:
                 raise HTTPException(status_code=401, detail="Session expired")
             
@@ -1175,7 +1223,7 @@ async def refresh_session(request: Request, response: JSONResponse):
             response=response,
             key="access_token",
             value=new_token,
-            max_age=int(os.getenv("JWT_EXPIRES_MINUTES", "15")) * 60,
+            max_age=JWT_EXPIRES_SECONDS,
             httponly=True,
             samesite="lax"
         )
@@ -1248,6 +1296,12 @@ async def sync_template_variables(request: Request):
         supported_languages = get_supported_languages()
         results = parser.sync_variables_to_database(supported_languages)
         
+        # Новые строки texts меняют счетчики Dashboard, закэшированные тексты страниц и переводы CMS
+        if results.get("added_variables"):
+            text_cache.clear()
+            translation_cache.clear()
+            stats_cache.clear()
+        
         return {
             "success": True,
             "message": "Template variables synchronized successfully",
@@ -1286,7 +1340,6 @@ async def get_template_analysis(request: Request):
     """Получить анализ шаблонов - найденные переменные, проблемы синтаксиса"""
     try:
         from app.utils.template_parser import TemplateParser
-        from pathlib import Path
         
         parser = TemplateParser()
         
@@ -1338,9 +1391,8 @@ async def get_translations(
             lang = get_language_from_request(request)
         
         # Валидация модулей
-        valid_modules = ["cms_users", "cms_texts", "cms_images", "cms_seo", "cms_template_variables", "header"]
-        if module not in valid_modules:
-            return {"success": False, "message": f"Недопустимый модуль. Доступные: {', '.join(valid_modules)}"}
+        if module not in _VALID_TRANSLATION_MODULES:
+            return {"success": False, "message": f"Недопустимый модуль. Доступные: {_VALID_TRANSLATION_MODULES_STR}"}
         
         # Получаем переводы для модуля
         if module == "cms_users":
@@ -1,6 +1,8 @@
 import os
 import sqlite3
 import logging
+import queue
+import threading
 from contextlib import contextmanager
 from pathlib import Path
 from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
@@ -25,22 +27,171 @@ def ensure_database_initialized() -> None:
         conn.commit()
 
 
+# Размер кэша подготовленных выражений на соединение (ключ - текст SQL)
+STATEMENT_CACHE_SIZE = 256
+# Сколько соединений для чтения держать открытыми между запросами
+READ_POOL_SIZE = int(os.getenv("DATABASE_READ_POOL_SIZE", "0")) or (os.cpu_count() or 4)
+
+# Настройки соединения, применяются один раз при открытии (соединения переиспользуются)
+_CONNECTION_PRAGMAS = (
+    "PRAGMA foreign_keys = ON;",
+    # В режиме WAL (задан в init.sql) NORMAL безопасен для целостности и убирает fsync на каждом коммите
+    "PRAGMA synchronous = NORMAL;",
+    # Кэш страниц ~20 МБ на соединение (отрицательное значение - в КиБ)
+    "PRAGMA cache_size = -20000;",
+    # Временные таблицы и индексы сортировок (DISTINCT, ORDER BY) - в памяти
+    "PRAGMA temp_store = MEMORY;",
+    # Чтение файла БД через mmap без копирования страниц в кэш SQLite (до 256 МБ)
+    "PRAGMA mmap_size = 268435456;",
+)
+
+
+# Busy timeout по умолчанию: ожидание блокировки писателя вместо немедленного SQLITE_BUSY
+_BUSY_TIMEOUT_SECONDS = 10
+
+
+def _open_connection(path: str) -> sqlite3.Connection:
+    # Соединение из пула используется разными потоками, но всегда только одним в каждый момент
+    conn = sqlite3.connect(path, timeout=_BUSY_TIMEOUT_SECONDS, cached_statements=STATEMENT_CACHE_SIZE, check_same_thread=False)
+    for pragma in _CONNECTION_PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
+
+class _ConnectionPool:
+    """
+    Пул соединений SQLite: до read_size соединений для чтения и одно для записи.
+    WAL допускает параллельных читателей и одного писателя - записи внутри процесса
+    сериализуются блокировкой, а не ожиданием SQLITE_BUSY.
+    Соединения живут долго, поэтому sqlite3 переиспользует подготовленные выражения
+    """
+
+    def __init__(self, path: str, read_size: int) -> None:
+        self.path = path
+        # LIFO: чаще всего выдается недавно использованное соединение с "теплым" кэшем
+        self._readers: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue(maxsize=read_size)
+        self._writer: Optional[sqlite3.Connection] = None
+        self.write_lock = threading.Lock()
+
+    def acquire_reader(self) -> sqlite3.Connection:
+        try:
+            return self._readers.get_nowait()
+        except queue.Empty:
+            # Пул пуст (все заняты) - открываем дополнительное соединение, а не ждем
+            return _open_connection(self.path)
+
+    def release_reader(self, conn: sqlite3.Connection) -> None:
+        try:
+            self._readers.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+    def writer(self) -> sqlite3.Connection:
+        """Соединение для записи; вызывать только под write_lock"""
+        if self._writer is None:
+            self._writer = _open_connection(self.path)
+        return self._writer
+
+    def close(self) -> None:
+        with self.write_lock:
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+        while True:
+            try:
+                self._readers.get_nowait().close()
+            except queue.Empty:
+                break
+
+
+_pool: Optional[_ConnectionPool] = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool() -> _ConnectionPool:
+    """Пул для текущего DB_PATH; при смене пути (тесты) создается заново"""
+    global _pool
+    path = os.fspath(DB_PATH)
+    pool = _pool
+    if pool is not None and pool.path == path:
+        return pool
+    with _pool_lock:
+        if _pool is None or _pool.path != path:
+            if _pool is not None:
+                _pool.close()
+            _pool = _ConnectionPool(path, READ_POOL_SIZE)
+        return _pool
+
+
+def close_connections() -> None:
+    """Закрыть все соединения пула (остановка приложения, тесты)"""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+            _pool = None
+
+
 @contextmanager
-def get_connection(row_factory_dict: bool = True) -> Iterator[sqlite3.Connection]:
-    conn = sqlite3.connect(DB_PATH, timeout=10)
+def get_connection(
+    row_factory_dict: bool = True, write: bool = False, timeout: Optional[float] = None
+) -> Iterator[sqlite3.Connection]:
+    """
+    Соединение из пула. timeout (только для write) ограничивает ожидание писателя - и блокировки
+    внутри процесса, и блокировки SQLite другим процессом; по истечении - sqlite3.OperationalError
+    """
+    pool = _get_pool()
+    if write:
+        if not pool.write_lock.acquire(timeout=-1 if timeout is None else timeout):
+            raise sqlite3.OperationalError("database is locked")
+        try:
+            conn = pool.writer()
+            if timeout is not None:
+                conn.execute(f"PRAGMA busy_timeout = {int(timeout * 1000)}")
+        except BaseException:
+            pool.write_lock.release()
+            raise
+    else:
+        conn = pool.acquire_reader()
+    conn.row_factory = _dict_factory if row_factory_dict else None  # type: ignore[assignment]
     try:
-        conn.execute("PRAGMA foreign_keys = ON;")
-        if row_factory_dict:
-            conn.row_factory = _dict_factory  # type: ignore[assignment]
         yield conn
     finally:
-        conn.close()
+        try:
+            # Незакоммиченные изменения не должны достаться следующему запросу на этом соединении
+            if conn.in_transaction:
+                conn.rollback()
+        finally:
+            if write:
+                try:
+                    if timeout is not None:
+                        conn.execute(f"PRAGMA busy_timeout = {_BUSY_TIMEOUT_SECONDS * 1000}")
+                finally:
+                    pool.write_lock.release()
+            else:
+                pool.release_reader(conn)
+
+
+@contextmanager
+def transaction() -> Iterator[sqlite3.Connection]:
+    """
+    Транзакция записи из нескольких выражений с одним коммитом.
+    BEGIN IMMEDIATE берет блокировку записи сразу, а не при первом изменении -
+    конкурирующие писатели ждут busy timeout, а не получают SQLITE_BUSY при повышении блокировки
+    """
+    with get_connection(write=True) as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        yield conn
+        conn.commit()
 
 
 def query_one(sql: str, params: Optional[Iterable[Any]] = None) -> Optional[Dict[str, Any]]:
     with get_connection() as conn:
         cur = conn.execute(sql, tuple(params or ()))
-        return cur.fetchone()  # type: ignore[return-value]
+        row = cur.fetchone()
+        # Сбрасываем недочитанное выражение, чтобы не удерживать снимок чтения на живом соединении
+        cur.close()
+        return row  # type: ignore[no-any-return]
 
 
 def query_all(sql: str, params: Optional[Iterable[Any]] = None) -> List[Dict[str, Any]]:
@@ -49,15 +200,31 @@ def query_all(sql: str, params: Optional[Iterable[Any]] = None) -> List[Dict[str
         return list(cur.fetchall())  # type: ignore[return-value]
 
 
+def query_dict(sql: str, params: Optional[Iterable[Any]] = None) -> Dict[Any, Any]:
+    """Выполнить SELECT из двух колонок и вернуть словарь {первая: вторая}; кортежи строк собираются в dict на стороне C"""
+    with get_connection(row_factory_dict=False) as conn:
+        return dict(conn.execute(sql, tuple(params or ())))
+
+
 def execute(sql: str, params: Optional[Iterable[Any]] = None) -> int:
-    with get_connection() as conn:
+    with get_connection(write=True) as conn:
         cur = conn.execute(sql, tuple(params or ()))
         conn.commit()
         return int(cur.lastrowid)
 
 
+def execute_returning(sql: str, params: Optional[Iterable[Any]] = None) -> Optional[Dict[str, Any]]:
+    """Выполнить изменяющее выражение с RETURNING и вернуть первую строку результата"""
+    with get_connection(write=True) as conn:
+        cur = conn.execute(sql, tuple(params or ()))
+        row = cur.fetchone()
+        cur.close()
+        conn.commit()
+        return row  # type: ignore[no-any-return]
+
+
 def executemany(sql: str, seq_of_params: Iterable[Iterable[Any]]) -> int:
-    with get_connection() as conn:
+    with get_connection(write=True) as conn:
         cur = conn.executemany(sql, list(map(tuple, seq_of_params)))
         conn.commit()
         return cur.rowcount
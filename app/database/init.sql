@@ -32,7 +32,9 @@ CREATE TABLE IF NOT EXISTS images (
   "order" INTEGER NOT NULL DEFAULT 0,
   created_at DATETIME NOT NULL DEFAULT (datetime('now'))
 );
-CREATE INDEX IF NOT EXISTS idx_images_type ON images(type);
+-- (type, "order") покрывает фильтр по типу, сортировку и MAX("order") при загрузке
+DROP INDEX IF EXISTS idx_images_type;
+CREATE INDEX IF NOT EXISTS idx_images_type_order ON images(type, "order");
 
 -- seo
 CREATE TABLE IF NOT EXISTS seo (
@@ -45,6 +47,15 @@ CREATE TABLE IF NOT EXISTS seo (
   UNIQUE(page, lang)
 );
 
+-- rate limits (token bucket, общий для всех воркеров)
+CREATE TABLE IF NOT EXISTS rate_limits (
+  key TEXT PRIMARY KEY,
+  tokens REAL NOT NULL,
+  updated_at REAL NOT NULL,
+  allowed INTEGER NOT NULL DEFAULT 1
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_rate_limits_updated_at ON rate_limits(updated_at);
+
 -- Dashboard translations
 INSERT OR IGNORE INTO texts (page, key, lang, value) VALUES
 -- English (default)
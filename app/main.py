@@ -1,21 +1,25 @@
 import logging
 import os
 from contextlib import asynccontextmanager
+from dotenv import load_dotenv
+
+# .env загружаем до импорта модулей app: они читают конфигурацию при импорте
+load_dotenv()
+
 from fastapi import FastAPI, Request, HTTPException
 from fastapi.staticfiles import StaticFiles
-from fastapi.templating import Jinja2Templates
-from fastapi.responses import RedirectResponse
+from app.utils.templates import create_templates
+from fastapi.responses import RedirectResponse, Response
 from app.auth.csrf import CSRFMiddleware
 from app.auth.middleware import AuthRedirectMiddleware
+from app.auth.security import calibrate_bcrypt_rounds
 from app.auth.security_headers import SecurityHeadersMiddleware
-from app.auth.routes import router as auth_router
-from app.cms.routes import router as cms_router
-from app.site.routes import router as site_router
+from app.auth.routes import router as auth_router, preload_templates as preload_auth_templates
+from app.cms.middleware import UploadSizeLimitMiddleware
+from app.cms.routes import router as cms_router, preload_templates as preload_cms_templates
+from app.site.routes import router as site_router, preload_templates as preload_site_templates
 from app.site.middleware import LanguageMiddleware, get_cms_url, get_cms_dashboard_url
-from dotenv import load_dotenv
-from app.database.db import ensure_database_initialized, smoke_test, ensure_admin_user_exists
-
-load_dotenv()
+from app.database.db import ensure_database_initialized, smoke_test, ensure_admin_user_exists, close_connections
 
 # Настройка логирования для отладки
 logging.basicConfig(
@@ -30,9 +34,20 @@ async def lifespan(app: FastAPI):
     ok = smoke_test()
     logging.info("DB smoke test: %s", "OK" if ok else "FAILED")
     
+    # Подбираем стоимость bcrypt под железо до первого хэширования пароля
+    calibrate_bcrypt_rounds()
+    
     # Проверяем и создаем администратора
     ensure_admin_user_exists()
     
+    # Прогреваем кэш скомпилированных шаблонов
+    try:
+        preload_auth_templates()
+        preload_cms_templates()
+        preload_site_templates()
+    except Exception as e:
+        logging.error(f"Ошибка предварительной компиляции шаблонов: {e}")
+    
     # Автоматический парсинг переменных шаблонов при запуске
     try:
         from app.utils.template_parser import TemplateParser
@@ -49,12 +64,16 @@ async def lifespan(app: FastAPI):
         logging.error(f"Ошибка при автоматическом парсинге шаблонов: {e}")
     
     yield
+    
+    # Закрываем соединения пула SQLite
+    close_connections()
 
 app = FastAPI(title="Business Card CMS", lifespan=lifespan)
 app.add_middleware(SecurityHeadersMiddleware)  # Добавляем первым для всех запросов
 app.add_middleware(CSRFMiddleware)
 app.add_middleware(AuthRedirectMiddleware)
 app.add_middleware(LanguageMiddleware)
+app.add_middleware(UploadSizeLimitMiddleware)  # Добавляем последним: отказ по размеру до любой обработки
 app.include_router(auth_router)
 # CMS роуты доступны через языковые префиксы: /{lang}/cms/...
 # Создаем отдельные роуты для каждого языка
@@ -77,7 +96,7 @@ app.include_router(site_router)
 # Static and templates
 app.mount("/static", StaticFiles(directory="app/static"), name="static")
 app.mount("/uploads", StaticFiles(directory="uploads"), name="uploads")
-templates = Jinja2Templates(directory="app/templates")
+templates = create_templates()
 
 # Добавляем глобальные функции в контекст шаблонов
 templates.env.globals.update({
@@ -85,8 +104,12 @@ templates.env.globals.update({
     "get_cms_dashboard_url": get_cms_dashboard_url
 })
 
+# Ответ healthcheck неизменен - кодируем JSON один раз при старте
+_HEALTH_BODY = b'{"status":"ok"}'
+
+
 @app.get("/health")
-async def healthcheck() -> dict:
-    return {"status": "ok"}
+async def healthcheck() -> Response:
+    return Response(content=_HEALTH_BODY, media_type="application/json")
 
 
@@ -3,7 +3,9 @@ Middleware для обработки мультиязычности
 Автоматическое определение языка из URL и сохранение в контексте запроса
 """
 import logging
+from functools import lru_cache
 from fastapi import Request, Response
+from starlette.convertors import Convertor, register_url_convertor
 from starlette.middleware.base import BaseHTTPMiddleware
 from typing import Callable
 import re
@@ -14,6 +16,21 @@ logger = logging.getLogger(__name__)
 # Регулярное выражение для извлечения языка из URL
 LANGUAGE_PATTERN = re.compile(r'^/([a-z]{2})(?:/|$)')
 
+
+class _LanguageConvertor(Convertor):
+    """Языковой префикс пути: совпадает только с поддерживаемыми языками, остальные пути идут дальше по роутеру"""
+    regex = "|".join(re.escape(lang) for lang in get_supported_languages())
+
+    def convert(self, value: str) -> str:
+        return value
+
+    def to_string(self, value: str) -> str:
+        return value
+
+
+# Конвертор {lang:lang} для языковых алиасов роутов (регистрируется до объявления роутеров)
+register_url_convertor("lang", _LanguageConvertor())
+
 class LanguageMiddleware(BaseHTTPMiddleware):
     """
     Middleware для автоматического определения языка из URL
@@ -206,6 +223,12 @@ def _generate_language_urls(current_path: str, current_language: str) -> dict:
     Returns:
         Словарь с URL для каждого языка
     """
+    # Результат зависит только от пути и конфигурации - берем из кэша, отдаем свежий dict
+    return dict(_language_urls_for_path(current_path))
+
+@lru_cache(maxsize=1024)
+def _language_urls_for_path(current_path: str) -> tuple:
+    """Пары (язык, URL) для пути; неизменяемый кортеж безопасно хранить в кэше"""
     from app.site.config import get_supported_languages, get_default_language
     
     supported_languages = get_supported_languages()
@@ -252,7 +275,7 @@ def _generate_language_urls(current_path: str, current_language: str) -> dict:
             else:
                 urls[lang] = f'/{lang}{clean_path}'
     
-    return urls
+    return tuple(urls.items())
 
 def set_language_cookie(response: Response, language: str) -> None:
     """
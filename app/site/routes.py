@@ -3,19 +3,33 @@
 """
 import logging
 from fastapi import APIRouter, Request, HTTPException, Form
-from fastapi.templating import Jinja2Templates
+from app.utils.templates import create_templates
 from fastapi.responses import HTMLResponse, JSONResponse
-from app.database.db import query_all, query_one
-from app.utils.cache import text_cache, image_cache
+from app.database.db import query_all, query_one, query_dict
+from app.utils.cache import text_cache, image_cache, seo_cache
 from app.site.middleware import get_language_from_request, get_supported_languages_from_request, get_language_urls_from_request, set_language_cookie
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List, Tuple
 import os
 from app.site.config import get_default_language
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
-templates = Jinja2Templates(directory="app/templates")
+templates = create_templates()
+
+# Шаблоны публичных страниц, компилируемые при старте приложения
+_SITE_TEMPLATES = ("public/home.html", "public/about.html", "public/catalog.html", "public/contacts.html")
+
+# Ключи текстов публичных страниц
+_PAGE_TEXT_KEYS = ("title", "subtitle", "description")
+_HOME_TEXT_KEYS = _PAGE_TEXT_KEYS + ("cta_text",)
+_CONTACTS_TEXT_KEYS = _PAGE_TEXT_KEYS + ("phone", "address")
+
+
+def preload_templates() -> None:
+    """Скомпилировать шаблоны сайта заранее, чтобы первый запрос не платил за компиляцию"""
+    for template_name in _SITE_TEMPLATES:
+        templates.env.get_template(template_name)
 
 
 def get_text(page: str, key: str, lang: str = get_default_language()) -> str:
@@ -44,6 +58,29 @@ def get_text(page: str, key: str, lang: str = get_default_language()) -> str:
         logger.error(f"Ошибка получения текста {page}.{key}.{lang}: {e}")
         return ""
 
+def get_texts_bulk(page: str, lang: str, keys: Tuple[str, ...]) -> Dict[str, str]:
+    """
+    Получить несколько текстов страницы одним запросом
+    
+    Args:
+        page: страница
+        lang: язык
+        keys: ключи полей
+    
+    Returns:
+        Словарь ключ -> значение; отсутствующие ключи - пустые строки (как в get_text)
+    """
+    try:
+        placeholders = ",".join("?" * len(keys))
+        found = query_dict(
+            f"SELECT key, value FROM texts WHERE page = ? AND lang = ? AND key IN ({placeholders})",
+            (page, lang, *keys)
+        )
+    except Exception as e:
+        logger.error(f"Ошибка получения текстов {page}.{lang}: {e}")
+        found = {}
+    return {key: found.get(key, "") for key in keys}
+
 def get_seo_data(page: str, lang: str = get_default_language()) -> Dict[str, str]:
     """
     Получить SEO данные для страницы
@@ -56,6 +93,10 @@ def get_seo_data(page: str, lang: str = get_default_language()) -> Dict[str, str
         Словарь с title, description, keywords
     """
     try:
+        cached_seo = seo_cache.get(page, lang)
+        if cached_seo is not None:
+            return cached_seo
+        
         result = query_one(
             "SELECT title, description, keywords FROM seo WHERE page = ? AND lang = ?",
             (page, lang)
@@ -67,12 +108,32 @@ def get_seo_data(page: str, lang: str = get_default_language()) -> Dict[str, str
             "keywords": result.get("keywords", "") if result else ""
         }
         
+        seo_cache.set(page, lang, seo_data)
         return seo_data
         
     except Exception as e:
         logger.error(f"Ошибка получения SEO данных {page}.{lang}: {e}")
         return {"title": "", "description": "", "keywords": ""}
 
+def get_cached_images(image_type: str) -> List[Dict[str, Any]]:
+    """
+    Получить все изображения указанного типа (по порядку) с кэшированием
+    
+    Args:
+        image_type: тип изображения (logo, slider, background, favicon)
+    
+    Returns:
+        Список строк images; кэш сбрасывается при загрузке, удалении и смене порядка
+    """
+    images = image_cache.get(image_type)
+    if images is None:
+        images = query_all(
+            "SELECT id, name, path, original_path, type, \"order\" FROM images WHERE type = ? ORDER BY \"order\"",
+            (image_type,)
+        )
+        image_cache.set(image_type, images)
+    return images
+
 def get_image(type: str, order: Optional[int] = None) -> Optional[Dict[str, str]]:
     """
     Получить изображение из БД
@@ -85,18 +146,13 @@ def get_image(type: str, order: Optional[int] = None) -> Optional[Dict[str, str]
         Словарь с path, original_path или None
     """
     try:
+        images = get_cached_images(type)
         if order is not None:
             # Для слайдера по порядку
-            result = query_one(
-                "SELECT path, original_path FROM images WHERE type = ? AND \"order\" = ? ORDER BY \"order\"",
-                (type, order)
-            )
+            result = next((image for image in images if image["order"] == order), None)
         else:
             # Для других типов - первое изображение
-            result = query_one(
-                "SELECT path, original_path FROM images WHERE type = ? ORDER BY \"order\" LIMIT 1",
-                (type,)
-            )
+            result = images[0] if images else None
         
         if result:
             return {
@@ -118,9 +174,7 @@ def get_slider_images() -> list:
         Список словарей с path, original_path
     """
     try:
-        results = query_all(
-            "SELECT path, original_path FROM images WHERE type = 'slider' ORDER BY \"order\""
-        )
+        results = get_cached_images("slider")
         
         return [
             {
@@ -135,6 +189,7 @@ def get_slider_images() -> list:
         return []
 
 @router.get("/", response_class=HTMLResponse)
+@router.get("/{lang:lang}/", response_class=HTMLResponse)
 async def home(request: Request):
     """Главная страница"""
     # Получаем язык из middleware
@@ -143,12 +198,7 @@ async def home(request: Request):
     language_urls = get_language_urls_from_request(request)
     
     # Получаем тексты
-    texts = {
-        "title": get_text("home", "title", lang),
-        "subtitle": get_text("home", "subtitle", lang),
-        "description": get_text("home", "description", lang),
-        "cta_text": get_text("home", "cta_text", lang)
-    }
+    texts = get_texts_bulk("home", lang, _HOME_TEXT_KEYS)
     
     # Получаем SEO данные
     seo_data = get_seo_data("home", lang)
@@ -171,6 +221,7 @@ async def home(request: Request):
     })
 
 @router.get("/about", response_class=HTMLResponse)
+@router.get("/{lang:lang}/about", response_class=HTMLResponse)
 async def about(request: Request):
     """Страница о компании"""
     # Получаем язык из middleware
@@ -178,11 +229,7 @@ async def about(request: Request):
     supported_languages = get_supported_languages_from_request(request)
     language_urls = get_language_urls_from_request(request)
     
-    texts = {
-        "title": get_text("about", "title", lang),
-        "subtitle": get_text("about", "subtitle", lang),
-        "description": get_text("about", "description", lang)
-    }
+    texts = get_texts_bulk("about", lang, _PAGE_TEXT_KEYS)
     
     seo_data = get_seo_data("about", lang)
     
@@ -196,6 +243,7 @@ async def about(request: Request):
     })
 
 @router.get("/catalog", response_class=HTMLResponse)
+@router.get("/{lang:lang}/catalog", response_class=HTMLResponse)
 async def catalog(request: Request):
     """Страница каталога"""
     # Получаем язык из middleware
@@ -203,11 +251,7 @@ async def catalog(request: Request):
     supported_languages = get_supported_languages_from_request(request)
     language_urls = get_language_urls_from_request(request)
     
-    texts = {
-        "title": get_text("catalog", "title", lang),
-        "subtitle": get_text("catalog", "subtitle", lang),
-        "description": get_text("catalog", "description", lang)
-    }
+    texts = get_texts_bulk("catalog", lang, _PAGE_TEXT_KEYS)
     
     seo_data = get_seo_data("catalog", lang)
     
@@ -221,6 +265,7 @@ async def catalog(request: Request):
     })
 
 @router.get("/contacts", response_class=HTMLResponse)
+@router.get("/{lang:lang}/contacts", response_class=HTMLResponse)
 async def contacts(request: Request):
     """Страница контактов"""
     # Получаем язык из middleware
@@ -228,13 +273,7 @@ async def contacts(request: Request):
     supported_languages = get_supported_languages_from_request(request)
     language_urls = get_language_urls_from_request(request)
     
-    texts = {
-        "title": get_text("contacts", "title", lang),
-        "subtitle": get_text("contacts", "subtitle", lang),
-        "description": get_text("contacts", "description", lang),
-        "phone": get_text("contacts", "phone", lang),
-        "address": get_text("contacts", "address", lang)
-    }
+    texts = get_texts_bulk("contacts", lang, _CONTACTS_TEXT_KEYS)
     
     seo_data = get_seo_data("contacts", lang)
     
@@ -247,55 +286,6 @@ async def contacts(request: Request):
         "language_urls": language_urls
     })
 
-# Мультиязычные алиасы
-@router.get("/ru/", response_class=HTMLResponse)
-async def home_ru(request: Request):
-    return await home(request)
-
-@router.get("/en/", response_class=HTMLResponse)
-async def home_en(request: Request):
-    return await home(request)
-
-@router.get("/ua/", response_class=HTMLResponse)
-async def home_ua(request: Request):
-    return await home(request)
-
-@router.get("/ru/about", response_class=HTMLResponse)
-async def about_ru(request: Request):
-    return await about(request)
-
-@router.get("/en/about", response_class=HTMLResponse)
-async def about_en(request: Request):
-    return await about(request)
-
-@router.get("/ua/about", response_class=HTMLResponse)
-async def about_ua(request: Request):
-    return await about(request)
-
-@router.get("/ru/catalog", response_class=HTMLResponse)
-async def catalog_ru(request: Request):
-    return await catalog(request)
-
-@router.get("/en/catalog", response_class=HTMLResponse)
-async def catalog_en(request: Request):
-    return await catalog(request)
-
-@router.get("/ua/catalog", response_class=HTMLResponse)
-async def catalog_ua(request: Request):
-    return await catalog(request)
-
-@router.get("/ru/contacts", response_class=HTMLResponse)
-async def contacts_ru(request: Request):
-    return await contacts(request)
-
-@router.get("/en/contacts", response_class=HTMLResponse)
-async def contacts_en(request: Request):
-    return await contacts(request)
-
-@router.get("/ua/contacts", response_class=HTMLResponse)
-async def contacts_ua(request: Request):
-    return await contacts(request)
-
 # API endpoint для переключения языка
 @router.post("/api/set-language")
 async def set_language_api(language: str = Form(...)):
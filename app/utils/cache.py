@@ -2,8 +2,10 @@
 Модуль кэширования для CMS
 In-memory кэш с TTL для текстов и SEO
 """
+import os
 import time
 import logging
+from collections import OrderedDict
 from typing import Dict, Any, Optional
 from threading import Lock
 
@@ -84,7 +86,7 @@ class TextCache:
             expired_entries = 0
             
             for entry in self.cache.values():
-                if time.time() < entry["expires_at"]:
+                if current_time < entry["expires_at"]:
                     active_entries += 1
                 else:
                     expired_entries += 1
@@ -211,6 +213,196 @@ class ImageCache:
             }
 
 
+class UserCache:
+    """In-memory кэш признака существования пользователя по id с TTL и ограничением размера"""
+    
+    def __init__(self, default_ttl: int = 30, max_size: int = 4096):
+        self.cache: Dict[str, Dict[str, Any]] = {}
+        self.default_ttl = default_ttl
+        self.max_size = max_size
+        self.lock = Lock()
+    
+    def get(self, user_id: Any) -> Optional[Any]:
+        """Получить данные пользователя из кэша"""
+        with self.lock:
+            cache_key = str(user_id)
+            entry = self.cache.get(cache_key)
+            if entry is None:
+                return None
+            if time.time() < entry["expires_at"]:
+                return entry["data"]
+            # Удаляем устаревшую запись
+            del self.cache[cache_key]
+            return None
+    
+    def set(self, user_id: Any, data: Any, ttl: Optional[int] = None) -> None:
+        """Сохранить данные пользователя в кэш"""
+        with self.lock:
+            cache_key = str(user_id)
+            if cache_key not in self.cache and len(self.cache) >= self.max_size:
+                # Вытесняем самую старую запись (dict сохраняет порядок вставки)
+                del self.cache[next(iter(self.cache))]
+            self.cache[cache_key] = {
+                "data": data,
+                "expires_at": time.time() + (ttl or self.default_ttl)
+            }
+    
+    def invalidate(self, user_id: Any) -> None:
+        """Инвалидировать кэш для конкретного пользователя"""
+        with self.lock:
+            self.cache.pop(str(user_id), None)
+    
+    def clear(self) -> None:
+        """Очистить весь кэш пользователей"""
+        with self.lock:
+            self.cache.clear()
+            logger.debug("User cache cleared")
+
+
+class TokenCache:
+    """In-memory кэш проверенных JWT payload: повторные запросы с тем же токеном не пересчитывают HMAC"""
+    
+    def __init__(self, default_ttl: int = 60, max_size: int = 10_000):
+        self.cache: Dict[str, Dict[str, Any]] = {}
+        self.default_ttl = default_ttl
+        self.max_size = max_size
+        self.lock = Lock()
+    
+    def get(self, token: str) -> Optional[Dict[str, Any]]:
+        """Получить payload токена из кэша"""
+        with self.lock:
+            entry = self.cache.get(token)
+            if entry is None:
+                return None
+            if time.time() < entry["expires_at"]:
+                return entry["data"]
+            # Удаляем устаревшую запись
+            del self.cache[token]
+            return None
+    
+    def set(self, token: str, payload: Dict[str, Any]) -> None:
+        """Сохранить payload в кэш; запись не переживает exp токена"""
+        now = time.time()
+        expires_at = now + self.default_ttl
+        exp = payload.get("exp")
+        if isinstance(exp, (int, float)):
+            expires_at = min(expires_at, exp)
+        if expires_at <= now:
+            return
+        with self.lock:
+            if token not in self.cache and len(self.cache) >= self.max_size:
+                # Вытесняем самую старую запись (dict сохраняет порядок вставки)
+                del self.cache[next(iter(self.cache))]
+            self.cache[token] = {"data": payload, "expires_at": expires_at}
+    
+    def invalidate(self, token: str) -> None:
+        """Удалить токен из кэша"""
+        with self.lock:
+            self.cache.pop(token, None)
+    
+    def clear(self) -> None:
+        """Очистить весь кэш токенов"""
+        with self.lock:
+            self.cache.clear()
+            logger.debug("Token cache cleared")
+
+
+class SEOCache:
+    """In-memory LRU кэш для SEO данных с TTL и ограничением размера"""
+    
+    def __init__(self, default_ttl: int = 300, max_size: int = 128):
+        self.cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self.default_ttl = default_ttl
+        self.max_size = max_size
+        self.lock = Lock()
+    
+    def _get_cache_key(self, page: str, lang: str) -> str:
+        """Создать ключ кэша для страницы и языка"""
+        return f"seo:{page}:{lang}"
+    
+    def get(self, page: str, lang: str) -> Optional[Dict[str, str]]:
+        """Получить SEO данные из кэша"""
+        with self.lock:
+            cache_key = self._get_cache_key(page, lang)
+            entry = self.cache.get(cache_key)
+            if entry is None:
+                return None
+            if time.time() < entry["expires_at"]:
+                # Отмечаем запись как недавно использованную
+                self.cache.move_to_end(cache_key)
+                return entry["data"]
+            # Удаляем устаревшую запись
+            del self.cache[cache_key]
+            logger.debug(f"SEO cache expired for {cache_key}")
+            return None
+    
+    def set(self, page: str, lang: str, seo: Dict[str, str], ttl: Optional[float] = None) -> None:
+        """Сохранить SEO данные в кэш"""
+        with self.lock:
+            cache_key = self._get_cache_key(page, lang)
+            self.cache[cache_key] = {
+                "data": seo.copy(),
+                "expires_at": time.time() + (ttl or self.default_ttl)
+            }
+            self.cache.move_to_end(cache_key)
+            if len(self.cache) > self.max_size:
+                # Вытесняем наименее недавно использованную запись
+                self.cache.popitem(last=False)
+    
+    def invalidate(self, page: str, lang: str) -> None:
+        """Инвалидировать кэш для конкретной страницы и языка"""
+        with self.lock:
+            self.cache.pop(self._get_cache_key(page, lang), None)
+    
+    def clear(self) -> None:
+        """Очистить весь SEO кэш"""
+        with self.lock:
+            self.cache.clear()
+            logger.debug("SEO cache cleared")
+
+
+class StatsCache:
+    """In-memory кэш одного значения (статистика Dashboard) с TTL"""
+    
+    def __init__(self, default_ttl: int = 30):
+        self.entry: Optional[Dict[str, Any]] = None
+        self.default_ttl = default_ttl
+        self.lock = Lock()
+    
+    def get(self) -> Optional[Any]:
+        """Получить значение из кэша"""
+        with self.lock:
+            entry = self.entry
+            if entry is None:
+                return None
+            if time.time() < entry["expires_at"]:
+                return entry["data"]
+            # Удаляем устаревшую запись
+            self.entry = None
+            return None
+    
+    def set(self, data: Any, ttl: Optional[int] = None) -> None:
+        """Сохранить значение в кэш"""
+        with self.lock:
+            self.entry = {
+                "data": data,
+                "expires_at": time.time() + (ttl or self.default_ttl)
+            }
+    
+    def clear(self) -> None:
+        """Очистить кэш"""
+        with self.lock:
+            self.entry = None
+            logger.debug("Stats cache cleared")
+
+
 # Глобальные экземпляры кэша
 text_cache = TextCache(default_ttl=300)  # 5 минут TTL
+translation_cache = TextCache(default_ttl=300)  # 5 минут TTL, готовые словари переводов CMS
 image_cache = ImageCache(default_ttl=600)  # 10 минут TTL
+seo_cache = SEOCache(default_ttl=300)  # 5 минут TTL, не более 128 записей
+# Кэш свой в каждом воркере: удаленный пользователь проходит проверку токена не дольше TTL
+user_cache = UserCache(default_ttl=int(os.getenv("USER_CACHE_TTL_SECONDS", "2")))  # 2 секунды TTL, 0 - без кэша
+token_cache = TokenCache(default_ttl=60)  # 60 секунд TTL, но не дольше exp токена
+stats_cache = StatsCache(default_ttl=30)  # 30 секунд TTL, сбрасывается при изменениях в CMS
+cache_stats_cache = StatsCache(default_ttl=2)  # 2 секунды TTL для /cms/api/cache/stats
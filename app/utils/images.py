@@ -4,10 +4,13 @@
 import os
 import uuid
 import io
+import shutil
 from PIL import Image
-from typing import Tuple, Optional
+from typing import BinaryIO, Tuple, Optional, Union
 import logging
 
+from app.utils.validation import sanitize_filename
+
 logger = logging.getLogger(__name__)
 
 # Поддерживаемые форматы
@@ -17,27 +20,52 @@ ALLOWED_MIME_TYPES = {'image/jpeg', 'image/png', 'image/webp', 'image/x-icon'}
 # Максимальный размер файла (2MB)
 MAX_FILE_SIZE = 2 * 1024 * 1024
 
+# Размер блока при потоковой записи загружаемого файла на диск
+COPY_CHUNK_SIZE = 64 * 1024
+
+# Сколько первых байтов файла достаточно для проверки сигнатуры формата
+HEADER_SNIFF_SIZE = 64
+
+# Сигнатуры (magic bytes) поддерживаемых форматов: JPEG, PNG, ICO; WebP проверяется отдельно
+_MAGIC_PREFIXES = (b"\xff\xd8\xff", b"\x89PNG\r\n\x1a\n", b"\x00\x00\x01\x00")
+
 # Настройки оптимизации
 WEBP_QUALITY = 80
 MAX_WIDTH = 1920
 
 
-def validate_image_file(file_content: bytes, filename: str, content_type: str) -> Tuple[bool, str]:
+ImageSource = Union[bytes, str]
+
+
+def _open_image(source: ImageSource) -> Image.Image:
+    """Открыть изображение из байтов или по пути к файлу (PIL читает файл лениво, без копии в памяти)"""
+    return Image.open(io.BytesIO(source) if isinstance(source, bytes) else source)
+
+
+def _source_size(source: ImageSource) -> int:
+    return len(source) if isinstance(source, bytes) else os.path.getsize(source)
+
+
+def _read_head(source: ImageSource) -> bytes:
+    """Первые HEADER_SNIFF_SIZE байтов источника"""
+    if isinstance(source, bytes):
+        return source[:HEADER_SNIFF_SIZE]
+    with open(source, 'rb') as f:
+        return f.read(HEADER_SNIFF_SIZE)
+
+
+def check_upload_header(head: bytes, filename: str, content_type: str) -> Tuple[bool, str]:
     """
-    Валидация загружаемого изображения
+    Быстрая проверка загрузки без чтения файла целиком: расширение, MIME тип и сигнатура
     
     Args:
-        file_content: содержимое файла
+        head: первые байты файла (достаточно HEADER_SNIFF_SIZE)
         filename: имя файла
         content_type: MIME тип
     
     Returns:
         (is_valid, error_message)
     """
-    # Проверка размера файла
-    if len(file_content) > MAX_FILE_SIZE:
-        return False, f"Файл слишком большой. Максимальный размер: {MAX_FILE_SIZE // (1024*1024)}MB"
-    
     # Проверка расширения файла
     file_ext = os.path.splitext(filename.lower())[1]
     if file_ext not in ALLOWED_EXTENSIONS:
@@ -47,9 +75,38 @@ def validate_image_file(file_content: bytes, filename: str, content_type: str) -
     if content_type not in ALLOWED_MIME_TYPES:
         return False, f"Неподдерживаемый MIME тип. Разрешены: {', '.join(ALLOWED_MIME_TYPES)}"
     
+    # Проверка сигнатуры: содержимое должно быть одним из поддерживаемых форматов
+    is_webp = head[:4] == b"RIFF" and head[8:12] == b"WEBP"
+    if not is_webp and not head.startswith(_MAGIC_PREFIXES):
+        return False, "Файл не является валидным изображением: неизвестная сигнатура формата"
+    
+    return True, ""
+
+
+def validate_image_file(file_content: ImageSource, filename: str, content_type: str) -> Tuple[bool, str]:
+    """
+    Валидация загружаемого изображения
+    
+    Args:
+        file_content: содержимое файла или путь к уже сохраненному файлу
+        filename: имя файла
+        content_type: MIME тип
+    
+    Returns:
+        (is_valid, error_message)
+    """
+    # Проверка размера файла
+    if _source_size(file_content) > MAX_FILE_SIZE:
+        return False, f"Файл слишком большой. Максимальный размер: {MAX_FILE_SIZE // (1024*1024)}MB"
+    
+    # Расширение, MIME тип и сигнатура
+    is_valid, error_message = check_upload_header(_read_head(file_content), filename, content_type)
+    if not is_valid:
+        return False, error_message
+    
     # Проверка, что файл является валидным изображением
     try:
-        with Image.open(io.BytesIO(file_content)) as img:
+        with _open_image(file_content) as img:
             img.verify()
     except Exception as e:
         return False, f"Файл не является валидным изображением: {str(e)}"
@@ -57,12 +114,12 @@ def validate_image_file(file_content: bytes, filename: str, content_type: str) -
     return True, ""
 
 
-def optimize_image(file_content: bytes, output_path: str, max_width: int = MAX_WIDTH, quality: int = WEBP_QUALITY) -> bool:
+def optimize_image(file_content: ImageSource, output_path: str, max_width: int = MAX_WIDTH, quality: int = WEBP_QUALITY) -> bool:
     """
     Оптимизация изображения и сохранение в WebP формате
     
     Args:
-        file_content: содержимое оригинального файла
+        file_content: содержимое оригинального файла или путь к нему
         output_path: путь для сохранения оптимизированного изображения
         max_width: максимальная ширина
         quality: качество WebP (0-100)
@@ -71,12 +128,10 @@ def optimize_image(file_content: bytes, output_path: str, max_width: int = MAX_W
         True если успешно, False иначе
     """
     try:
-        import io
-        
         # Создаем директорию если не существует
         os.makedirs(os.path.dirname(output_path), exist_ok=True)
         
-        with Image.open(io.BytesIO(file_content)) as img:
+        with _open_image(file_content) as img:
             # Конвертируем в RGB если необходимо
             if img.mode in ('RGBA', 'LA', 'P'):
                 # Создаем белый фон для прозрачных изображений
@@ -132,6 +187,40 @@ def save_original_image(file_content: bytes, original_path: str) -> bool:
         return False
 
 
+def save_upload_stream(source: BinaryIO, output_path: str) -> bool:
+    """
+    Потоковая запись загружаемого файла на диск блоками, без чтения целиком в память
+    
+    Args:
+        source: файловый объект загрузки (UploadFile.file)
+        output_path: путь для сохранения
+    
+    Returns:
+        True если успешно, False иначе
+    """
+    try:
+        # Создаем директорию если не существует
+        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+        
+        # Пишем во временный файл рядом и переименовываем: оборванная копия не останется под итоговым именем
+        partial_path = output_path + ".part"
+        source.seek(0)
+        with open(partial_path, 'wb') as f:
+            shutil.copyfileobj(source, f, COPY_CHUNK_SIZE)
+        os.replace(partial_path, output_path)
+            
+        logger.info(f"Оригинальное изображение сохранено: {output_path}")
+        return True
+        
+    except Exception as e:
+        logger.error(f"Ошибка сохранения оригинального изображения: {e}")
+        try:
+            os.remove(output_path + ".part")
+        except OSError:
+            pass
+        return False
+
+
 def generate_unique_filename(original_filename: str) -> str:
     """
     Генерация уникального имени файла с очисткой от опасных символов
@@ -142,8 +231,6 @@ def generate_unique_filename(original_filename: str) -> str:
     Returns:
         Безопасное уникальное имя файла
     """
-    from app.utils.validation import sanitize_filename
-    
     # Сначала очищаем имя файла от опасных символов
     safe_filename = sanitize_filename(original_filename)
     
@@ -160,20 +247,18 @@ def generate_unique_filename(original_filename: str) -> str:
     return f"{unique_id}{file_ext}"
 
 
-def get_image_info(file_content: bytes) -> Optional[dict]:
+def get_image_info(file_content: ImageSource) -> Optional[dict]:
     """
-    Получение информации об изображении
+    Получение информации об изображении (читается только заголовок файла)
     
     Args:
-        file_content: содержимое файла
+        file_content: содержимое файла или путь к нему
     
     Returns:
         Словарь с информацией об изображении или None
     """
     try:
-        import io
-        
-        with Image.open(io.BytesIO(file_content)) as img:
+        with _open_image(file_content) as img:
             return {
                 'width': img.width,
                 'height': img.height,
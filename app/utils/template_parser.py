@@ -6,7 +6,7 @@ import os
 import logging
 from pathlib import Path
 from typing import Dict, List, Set, Tuple, Optional
-from app.database.db import execute, query_one, query_all
+from app.database.db import query_one, query_all, transaction
 
 logger = logging.getLogger(__name__)
 
@@ -234,43 +234,41 @@ class TemplateParser:
             
             logger.info(f"Начинаем синхронизацию {len(template_variables)} страниц")
             
-            for page, variables in template_variables.items():
-                if page == 'unknown':
-                    logger.warning("Пропускаем страницу 'unknown'")
-                    continue
-                
-                logger.info(f"Синхронизация страницы {page} с {len(variables)} переменными")
-                
-                for variable in variables:
-                    # Извлекаем ключ из переменной (texts.title -> title)
-                    if '.' in variable:
-                        key = variable.split('.', 1)[1]
-                    else:
-                        key = variable
+            # Все вставки - в одной транзакции записи вместо отдельного коммита на каждую переменную
+            with transaction() as conn:
+                for page, variables in template_variables.items():
+                    if page == 'unknown':
+                        logger.warning("Пропускаем страницу 'unknown'")
+                        continue
                     
-                    for lang in supported_languages:
-                        try:
-                            # Проверяем, существует ли уже запись
-                            existing = query_one(
-                                "SELECT id FROM texts WHERE page = ? AND key = ? AND lang = ?",
-                                (page, key, lang)
-                            )
-                            
-                            if not existing:
-                                # Добавляем новую переменную с пустым значением
-                                execute(
-                                    "INSERT INTO texts (page, key, lang, value) VALUES (?, ?, ?, ?)",
+                    logger.info(f"Синхронизация страницы {page} с {len(variables)} переменными")
+                    
+                    for variable in variables:
+                        # Извлекаем ключ из переменной (texts.title -> title)
+                        if '.' in variable:
+                            key = variable.split('.', 1)[1]
+                        else:
+                            key = variable
+                        
+                        for lang in supported_languages:
+                            try:
+                                # Добавляем новую переменную с пустым значением; существующая запись не меняется
+                                added = conn.execute(
+                                    "INSERT INTO texts (page, key, lang, value) VALUES (?, ?, ?, ?) "
+                                    "ON CONFLICT(page, key, lang) DO NOTHING",
                                     (page, key, lang, "")
-                                )
-                                results['added_variables'] += 1
-                                logger.debug(f"Добавлена переменная: {page}.{key}.{lang}")
-                            else:
-                                results['skipped_variables'] += 1
-                                logger.debug(f"Переменная уже существует: {page}.{key}.{lang}")
+                                ).rowcount
                                 
-                        except Exception as e:
-                            results['errors'] += 1
-                            logger.error(f"Ошибка добавления переменной {page}.{key}.{lang}: {e}")
+                                if added:
+                                    results['added_variables'] += 1
+                                    logger.debug(f"Добавлена переменная: {page}.{key}.{lang}")
+                                else:
+                                    results['skipped_variables'] += 1
+                                    logger.debug(f"Переменная уже существует: {page}.{key}.{lang}")
+                                    
+                            except Exception as e:
+                                results['errors'] += 1
+                                logger.error(f"Ошибка добавления переменной {page}.{key}.{lang}: {e}")
             
             logger.info(f"Синхронизация завершена: {results}")
             return results
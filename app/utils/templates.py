@@ -0,0 +1,69 @@
+"""
+Настройка Jinja2 шаблонов для всех роутеров
+"""
+import os
+import tempfile
+import logging
+from typing import Optional
+
+from fastapi.templating import Jinja2Templates
+from jinja2 import FileSystemBytecodeCache
+
+logger = logging.getLogger(__name__)
+
+TEMPLATES_DIR = "app/templates"
+
+# Без auto_reload Jinja не делает stat() шаблона на каждый рендер; в development оставляем перезагрузку
+JINJA_AUTORELOAD = os.getenv(
+    "JINJA_AUTORELOAD", "0" if os.getenv("ENVIRONMENT", "development") == "production" else "1"
+) == "1"
+
+# Каталог для скомпилированного байткода шаблонов (общий для всех воркеров, переживает перезапуск)
+JINJA_BYTECODE_CACHE_DIR = os.getenv(
+    "JINJA_BYTECODE_CACHE_DIR", os.path.join(tempfile.gettempdir(), "jinja_cache")
+)
+
+
+def _bytecode_cache() -> Optional[FileSystemBytecodeCache]:
+    """Создать файловый кэш байткода; при недоступном каталоге шаблоны компилируются как обычно"""
+    if not JINJA_BYTECODE_CACHE_DIR:
+        return None
+    try:
+        os.makedirs(JINJA_BYTECODE_CACHE_DIR, exist_ok=True)
+    except OSError as e:
+        logger.warning("Jinja bytecode cache disabled: %s", e)
+        return None
+    return FileSystemBytecodeCache(JINJA_BYTECODE_CACHE_DIR)
+
+
+def _scan_templates_version(directory: str) -> str:
+    """Максимальное время изменения файлов шаблонов (в наносекундах) в виде строки"""
+    latest = 0
+    for root, _dirs, files in os.walk(directory):
+        for name in files:
+            try:
+                latest = max(latest, os.stat(os.path.join(root, name)).st_mtime_ns)
+            except OSError:
+                continue
+    return str(latest)
+
+
+_TEMPLATES_VERSION = _scan_templates_version(TEMPLATES_DIR)
+
+
+def templates_version() -> str:
+    """
+    Версия шаблонов для HTTP валидаторов (ETag).
+    Без auto_reload шаблоны не перечитываются, поэтому версия фиксируется при старте
+    """
+    if JINJA_AUTORELOAD:
+        return _scan_templates_version(TEMPLATES_DIR)
+    return _TEMPLATES_VERSION
+
+
+def create_templates(directory: str = TEMPLATES_DIR) -> Jinja2Templates:
+    """Создать Jinja2Templates с кэшем байткода и auto_reload в зависимости от окружения"""
+    templates = Jinja2Templates(directory=directory)
+    templates.env.auto_reload = JINJA_AUTORELOAD
+    templates.env.bytecode_cache = _bytecode_cache()
+    return templates
@@ -14,7 +14,7 @@ from unittest.mock import patch
 # Добавляем путь к модулям приложения
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
 
-from app.utils.cache import TextCache, SEOCache
+from app.utils.cache import TextCache, SEOCache, UserCache, TokenCache, StatsCache
 
 class TestTextCache(unittest.TestCase):
     """Тесты для TextCache"""
@@ -278,6 +278,30 @@ class TestSEOCache(unittest.TestCase):
         # Проверка отсутствия данных
         self.assertIsNone(self.cache.get("home", "ru"))
         self.assertIsNone(self.cache.get("about", "en"))
+    
+    def test_seo_cache_lru_eviction(self):
+        """Тест вытеснения наименее недавно использованной записи"""
+        cache = SEOCache(default_ttl=60, max_size=2)
+        cache.set("home", "ru", {"title": "Главная"})
+        cache.set("about", "ru", {"title": "О нас"})
+        
+        # Обращение делает home самой свежей записью
+        cache.get("home", "ru")
+        cache.set("catalog", "ru", {"title": "Каталог"})
+        
+        self.assertIsNotNone(cache.get("home", "ru"))
+        self.assertIsNone(cache.get("about", "ru"))
+        self.assertIsNotNone(cache.get("catalog", "ru"))
+    
+    def test_seo_cache_invalidate(self):
+        """Тест инвалидации SEO кэша"""
+        self.cache.set("home", "ru", {"title": "Test"})
+        self.cache.set("home", "en", {"title": "Test"})
+        
+        self.cache.invalidate("home", "ru")
+        
+        self.assertIsNone(self.cache.get("home", "ru"))
+        self.assertIsNotNone(self.cache.get("home", "en"))
 
 
 class TestCacheIntegration(unittest.TestCase):
@@ -360,6 +384,90 @@ class TestCacheIntegration(unittest.TestCase):
             self.assertIsNone(result, f"Данные для page_{i} должны быть удалены")
 
 
+class TestUserCache(unittest.TestCase):
+    """Тесты для UserCache"""
+    
+    def test_user_cache_basic_operations(self):
+        """Тест базовых операций кэша пользователей"""
+        cache = UserCache(default_ttl=1)
+        self.assertIsNone(cache.get(1))
+        
+        cache.set(1, True)
+        cache.set("2", False)
+        self.assertTrue(cache.get("1"))
+        self.assertFalse(cache.get(2))
+        
+        cache.invalidate(1)
+        self.assertIsNone(cache.get(1))
+    
+    def test_user_cache_ttl_expiration(self):
+        """Тест истечения TTL"""
+        cache = UserCache(default_ttl=0.1)
+        cache.set(1, True)
+        time.sleep(0.2)
+        self.assertIsNone(cache.get(1))
+    
+    def test_user_cache_max_size(self):
+        """Тест вытеснения старых записей при переполнении"""
+        cache = UserCache(default_ttl=60, max_size=3)
+        for user_id in range(5):
+            cache.set(user_id, True)
+        
+        self.assertEqual(len(cache.cache), 3)
+        self.assertIsNone(cache.get(0))
+        self.assertTrue(cache.get(4))
+
+
+class TestTokenCache(unittest.TestCase):
+    """Тесты для TokenCache"""
+    
+    def setUp(self):
+        """Настройка перед каждым тестом"""
+        self.cache = TokenCache(default_ttl=60, max_size=2)
+    
+    def test_ttl_bounded_by_exp(self):
+        """Тест: запись не живет дольше exp токена"""
+        with patch("app.utils.cache.time.time", return_value=1000.0):
+            self.cache.set("token", {"sub": "1", "exp": 1005})
+            self.assertEqual(self.cache.get("token"), {"sub": "1", "exp": 1005})
+        with patch("app.utils.cache.time.time", return_value=1005.0):
+            self.assertIsNone(self.cache.get("token"))
+    
+    def test_expired_payload_not_cached(self):
+        """Тест: просроченный payload не сохраняется"""
+        with patch("app.utils.cache.time.time", return_value=1000.0):
+            self.cache.set("token", {"sub": "1", "exp": 999})
+        self.assertEqual(len(self.cache.cache), 0)
+    
+    def test_invalidate_and_eviction(self):
+        """Тест инвалидации и ограничения размера"""
+        self.cache.set("a", {"sub": "1"})
+        self.cache.set("b", {"sub": "2"})
+        self.cache.set("c", {"sub": "3"})
+        self.assertIsNone(self.cache.get("a"))
+        self.cache.invalidate("b")
+        self.assertIsNone(self.cache.get("b"))
+        self.assertEqual(self.cache.get("c"), {"sub": "3"})
+
+
+
+class TestStatsCache(unittest.TestCase):
+    """Тесты для StatsCache"""
+    
+    def test_ttl_and_clear(self):
+        """Тест истечения TTL и сброса значения"""
+        cache = StatsCache(default_ttl=30)
+        self.assertIsNone(cache.get())
+        with patch("app.utils.cache.time.time", return_value=1000.0):
+            cache.set({"users_count": 1})
+            self.assertEqual(cache.get(), {"users_count": 1})
+        with patch("app.utils.cache.time.time", return_value=1030.0):
+            self.assertIsNone(cache.get())
+        cache.set({"users_count": 2})
+        cache.clear()
+        self.assertIsNone(cache.get())
+
+
 if __name__ == "__main__":
     # Настройка тестирования
     unittest.main(verbosity=2)
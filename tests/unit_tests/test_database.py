@@ -16,8 +16,8 @@ from pathlib import Path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
 
 from app.database.db import (
-    get_connection, query_one, query_all, execute, executemany,
-    ensure_database_initialized, _dict_factory
+    get_connection, query_one, query_all, query_dict, execute, executemany,
+    ensure_database_initialized, _dict_factory, close_connections, transaction
 )
 
 class TestDatabaseConnection(unittest.TestCase):
@@ -489,6 +489,69 @@ class TestDatabaseIntegration(unittest.TestCase):
         self.assertEqual(len(results), 0)
 
 
+
+class TestConnectionReuse(unittest.TestCase):
+    """Тесты для пула соединений"""
+    
+    def setUp(self):
+        """Настройка временной базы данных"""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.db_patch = patch("app.database.db.DB_PATH", Path(self.temp_dir.name) / "test.db")
+        self.db_patch.start()
+        execute("CREATE TABLE test (id INTEGER PRIMARY KEY, value TEXT)")
+    
+    def tearDown(self):
+        """Очистка после каждого теста"""
+        close_connections()
+        self.db_patch.stop()
+        self.temp_dir.cleanup()
+    
+    def test_same_connection_reused(self):
+        """Тест: повторные вызовы получают одно и то же соединение"""
+        with get_connection() as first:
+            pass
+        with get_connection(row_factory_dict=False) as second:
+            self.assertIs(first, second)
+            self.assertIsNone(second.row_factory)
+    
+    def test_writer_separate_from_readers(self):
+        """Тест: запись идет через отдельное соединение, видимое читателям после коммита"""
+        with get_connection() as reader, get_connection(write=True) as writer:
+            self.assertIsNot(reader, writer)
+        execute("INSERT INTO test (value) VALUES (?)", ("written",))
+        self.assertEqual(query_one("SELECT value FROM test")["value"], "written")
+    
+    def test_uncommitted_changes_discarded(self):
+        """Тест: незакоммиченные изменения не переходят к следующему использованию"""
+        with get_connection() as conn:
+            conn.execute("INSERT INTO test (value) VALUES (?)", ("pending",))
+        self.assertEqual(query_all("SELECT * FROM test"), [])
+    
+    def test_transaction_commits_or_rolls_back(self):
+        """Тест: transaction() коммитит все выражения или ни одного"""
+        with transaction() as conn:
+            conn.executemany("INSERT INTO test (value) VALUES (?)", [("a",), ("b",)])
+        with self.assertRaises(sqlite3.IntegrityError):
+            with transaction() as conn:
+                conn.execute("INSERT INTO test (value) VALUES (?)", ("c",))
+                conn.execute("INSERT INTO test (id, value) VALUES (1, 'duplicate')")
+        self.assertEqual([row["value"] for row in query_all("SELECT value FROM test ORDER BY id")], ["a", "b"])
+    
+    def test_query_dict(self):
+        """Тест: query_dict собирает словарь из двух колонок"""
+        executemany("INSERT INTO test (value) VALUES (?)", [("a",), ("b",)])
+        self.assertEqual(query_dict("SELECT value, id FROM test"), {"a": 1, "b": 2})
+        self.assertEqual(query_dict("SELECT value, id FROM test WHERE id = ?", (99,)), {})
+    
+    def test_reconnect_on_path_change(self):
+        """Тест: смена DB_PATH открывает новое соединение"""
+        with get_connection() as first:
+            pass
+        with patch("app.database.db.DB_PATH", Path(self.temp_dir.name) / "other.db"):
+            with get_connection() as second:
+                self.assertIsNot(first, second)
+
+
 if __name__ == "__main__":
     # Настройка тестирования
     unittest.main(verbosity=2)
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Юнит-тесты для JWT токенов
+Проверяет совместимость быстрого HS256 пути с PyJWT
+"""
+
+import sys
+import os
+import time
+import unittest
+from unittest.mock import patch
+
+# Добавляем путь к модулям приложения
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+# Секрет читается при импорте модуля безопасности
+os.environ.setdefault("JWT_SECRET", "unit-test-secret")
+
+import jwt
+
+from app.auth import security
+from app.auth.security import create_access_token, decode_token
+
+
+class TestAccessToken(unittest.TestCase):
+    """Тесты для create_access_token и decode_token"""
+
+    def test_roundtrip(self):
+        """Тест выпуска и проверки токена"""
+        token = create_access_token(subject="42", role="editor")
+        payload = decode_token(token)
+
+        self.assertIsNotNone(payload)
+        self.assertEqual(payload["sub"], "42")
+        self.assertEqual(payload["role"], "editor")
+        self.assertEqual(payload["type"], "access")
+
+    def test_compatible_with_pyjwt(self):
+        """Тест совместимости токенов с PyJWT в обе стороны"""
+        token = create_access_token(subject="1", role="admin")
+        payload = jwt.decode(token, security._JWT_SECRET, algorithms=["HS256"])
+        self.assertEqual(payload["sub"], "1")
+
+        foreign = jwt.encode({"sub": "2", "exp": int(time.time()) + 60}, security._JWT_SECRET, algorithm="HS256")
+        self.assertEqual(decode_token(foreign)["sub"], "2")
+
+    def test_tampered_token_rejected(self):
+        """Тест отклонения токена с измененной подписью или payload"""
+        token = create_access_token(subject="42", role="editor")
+        header, body, signature = token.split(".")
+        forged_body = security._b64url_encode(b'{"sub":"1","role":"admin","exp":9999999999}').decode()
+
+        self.assertIsNone(decode_token(f"{header}.{body}.{signature[::-1]}"))
+        self.assertIsNone(decode_token(f"{header}.{forged_body}.{signature}"))
+        self.assertIsNone(decode_token("garbage"))
+
+    def test_expired_token_rejected(self):
+        """Тест отклонения просроченного токена"""
+        token = create_access_token(subject="42", role="editor", expires_minutes=1)
+        with patch("app.auth.security.time.time", return_value=time.time() + 120):
+            self.assertIsNone(decode_token(token))
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
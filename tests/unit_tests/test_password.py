@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Юнит-тесты для хэширования паролей
+Проверяет, что хэш-заглушка для несуществующих пользователей совпадает по стоимости с хранимыми
+"""
+
+import sys
+import os
+import unittest
+from unittest.mock import patch
+
+# Добавляем путь к модулям приложения
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+# Секрет читается при импорте модуля безопасности
+os.environ.setdefault("JWT_SECRET", "unit-test-secret")
+
+from app.auth import security
+from app.auth.security import hash_password, verify_dummy_password
+
+
+def _rounds(password_hash: str) -> int:
+    """Стоимость из хэша вида $2b$NN$..."""
+    return int(password_hash.split("$")[2])
+
+
+class TestDummyPasswordHash(unittest.TestCase):
+    """Тесты для _dummy_password_hash"""
+
+    def setUp(self):
+        security._dummy_password_hash.cache_clear()
+
+    def tearDown(self):
+        security._dummy_password_hash.cache_clear()
+
+    def test_cost_matches_stored_hashes(self):
+        """Тест: стоимость заглушки берется из хранимых хэшей, а не из BCRYPT_ROUNDS"""
+        stored_hash = hash_password("secret", rounds=5)
+        with patch.object(security, "BCRYPT_ROUNDS", 4), \
+                patch.object(security, "query_one", return_value={"rounds": stored_hash[4:6]}):
+            dummy_hash = security._dummy_password_hash()
+
+        self.assertEqual(_rounds(dummy_hash), _rounds(stored_hash))
+
+    def test_cost_falls_back_without_users(self):
+        """Тест: без пользователей используется BCRYPT_ROUNDS"""
+        with patch.object(security, "BCRYPT_ROUNDS", 4), \
+                patch.object(security, "query_one", return_value=None):
+            dummy_hash = security._dummy_password_hash()
+
+        self.assertEqual(_rounds(dummy_hash), 4)
+
+    def test_dummy_password_never_matches(self):
+        """Тест: проверка против заглушки всегда неуспешна"""
+        with patch.object(security, "query_one", return_value={"rounds": "04"}):
+            self.assertFalse(verify_dummy_password("secret"))
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Юнит-тесты для rate limiter
+Проверяет скользящее окно и вытеснение холодных ключей
+"""
+
+import sys
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+# Добавляем путь к модулям приложения
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from app.auth.rate_limit import (
+    SlidingWindowLimiter, ShardedSlidingWindowLimiter, SQLiteTokenBucketLimiter,
+    _parse_networks, client_ip, client_key
+)
+from app.database.db import close_connections, ensure_database_initialized, get_connection, query_one
+
+
+class TestSlidingWindowLimiter(unittest.TestCase):
+    """Тесты для SlidingWindowLimiter"""
+
+    def test_limit_within_window(self):
+        """Тест блокировки после исчерпания лимита"""
+        limiter = SlidingWindowLimiter(max_events=3, window_seconds=60)
+        with patch("app.auth.rate_limit.time.monotonic", return_value=100.0):
+            self.assertTrue(limiter.allow("ip"))
+            self.assertTrue(limiter.allow("ip"))
+            self.assertTrue(limiter.allow("ip"))
+            self.assertFalse(limiter.allow("ip"))
+            # Другие ключи не затронуты
+            self.assertTrue(limiter.allow("other"))
+
+    def test_window_slides(self):
+        """Тест освобождения слотов по мере сдвига окна"""
+        limiter = SlidingWindowLimiter(max_events=2, window_seconds=10)
+        with patch("app.auth.rate_limit.time.monotonic") as clock:
+            clock.return_value = 0.0
+            self.assertTrue(limiter.allow("ip"))
+            clock.return_value = 5.0
+            self.assertTrue(limiter.allow("ip"))
+            self.assertFalse(limiter.allow("ip"))
+            # Первое событие вышло из окна, второе еще внутри
+            clock.return_value = 10.5
+            self.assertTrue(limiter.allow("ip"))
+            self.assertFalse(limiter.allow("ip"))
+
+    def test_cold_keys_evicted(self):
+        """Тест ограничения количества хранимых ключей"""
+        limiter = SlidingWindowLimiter(max_events=1, window_seconds=60, max_keys=2)
+        limiter.allow("a")
+        limiter.allow("b")
+        limiter.allow("c")
+
+        self.assertEqual(len(limiter._buckets), 2)
+        self.assertNotIn("a", limiter._buckets)
+
+
+class TestShardedSlidingWindowLimiter(unittest.TestCase):
+    """Тесты для ShardedSlidingWindowLimiter"""
+
+    def test_keys_limited_independently(self):
+        """Тест независимого лимита для каждого ключа"""
+        limiter = ShardedSlidingWindowLimiter(max_events=2, window_seconds=60)
+        for key in ("10.0.0.1", "10.0.0.2", "10.0.0.3"):
+            self.assertTrue(limiter.allow(key))
+            self.assertTrue(limiter.allow(key))
+            self.assertFalse(limiter.allow(key))
+
+    def test_invalid_shard_count(self):
+        """Тест проверки количества шардов"""
+        with self.assertRaises(ValueError):
+            ShardedSlidingWindowLimiter(max_events=1, window_seconds=1, shards=10)
+
+
+class TestSQLiteTokenBucketLimiter(unittest.TestCase):
+    """Тесты для SQLiteTokenBucketLimiter"""
+
+    def setUp(self):
+        """Настройка временной базы данных"""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.db_patch = patch("app.database.db.DB_PATH", Path(self.temp_dir.name) / "test.db")
+        self.db_patch.start()
+        ensure_database_initialized()
+
+    def tearDown(self):
+        """Очистка после каждого теста"""
+        # Соединения пула держат файл БД открытым - иначе на Windows каталог не удаляется
+        close_connections()
+        self.db_patch.stop()
+        self.temp_dir.cleanup()
+
+    def test_burst_then_refill(self):
+        """Тест исчерпания ведра и пополнения со временем"""
+        limiter = SQLiteTokenBucketLimiter(rate=0.1, burst=2)
+        with patch("app.auth.rate_limit.time.time") as clock:
+            clock.return_value = 1000.0
+            self.assertTrue(limiter.allow("ip"))
+            self.assertTrue(limiter.allow("ip"))
+            self.assertFalse(limiter.allow("ip"))
+            # Другие ключи не затронуты
+            self.assertTrue(limiter.allow("other"))
+            # Через 10 секунд восстанавливается один токен
+            clock.return_value = 1010.0
+            self.assertTrue(limiter.allow("ip"))
+            self.assertFalse(limiter.allow("ip"))
+
+    def test_shared_between_instances(self):
+        """Тест общего лимита для разных экземпляров (воркеров)"""
+        first = SQLiteTokenBucketLimiter(rate=0.01, burst=1)
+        second = SQLiteTokenBucketLimiter(rate=0.01, burst=1)
+        self.assertTrue(first.allow("ip"))
+        self.assertFalse(second.allow("ip"))
+
+    def test_stale_buckets_cleaned_up(self):
+        """Тест удаления полностью восстановившихся ведер"""
+        limiter = SQLiteTokenBucketLimiter(rate=1.0, burst=1, cleanup_interval=0)
+        with patch("app.auth.rate_limit.time.time") as clock:
+            clock.return_value = 1000.0
+            limiter.allow("old")
+            clock.return_value = 2000.0
+            limiter.allow("new")
+        self.assertIsNone(query_one("SELECT key FROM rate_limits WHERE key = ?", ("old",)))
+
+    def test_fallback_when_storage_unavailable(self):
+        """Тест перехода на локальный лимитер при недоступной БД"""
+        fallback = ShardedSlidingWindowLimiter(max_events=1, window_seconds=60)
+        limiter = SQLiteTokenBucketLimiter(rate=1.0, burst=5, fallback=fallback)
+        with patch("app.database.db.DB_PATH", Path(self.temp_dir.name) / "missing" / "test.db"):
+            self.assertTrue(limiter.allow("ip"))
+            self.assertFalse(limiter.allow("ip"))
+
+    def test_fallback_when_writer_busy(self):
+        """Тест: занятый писатель не задерживает вход дольше timeout, решает локальный лимитер"""
+        fallback = ShardedSlidingWindowLimiter(max_events=1, window_seconds=60)
+        limiter = SQLiteTokenBucketLimiter(rate=1.0, burst=5, fallback=fallback, timeout=0.05)
+        with get_connection(write=True):
+            self.assertTrue(limiter.allow("ip"))
+            self.assertFalse(limiter.allow("ip"))
+
+
+class TestClientIp(unittest.TestCase):
+    """Тесты для определения IP клиента за прокси"""
+
+    def test_forwarded_for_ignored_without_trusted_proxy(self):
+        """Тест игнорирования X-Forwarded-For от недоверенного соединения"""
+        with patch("app.auth.rate_limit.TRUSTED_PROXIES", ()):
+            self.assertEqual(client_ip("203.0.113.7", "198.51.100.1"), "203.0.113.7")
+
+    def test_rightmost_untrusted_hop(self):
+        """Тест выбора самого правого недоверенного адреса цепочки"""
+        with patch("app.auth.rate_limit.TRUSTED_PROXIES", _parse_networks("127.0.0.1/32, 10.0.0.0/8")):
+            # Левый адрес подставлен клиентом и не учитывается
+            self.assertEqual(client_ip("127.0.0.1", "1.2.3.4, 198.51.100.1, 10.0.0.5"), "198.51.100.1")
+            self.assertEqual(client_ip("127.0.0.1", ""), "127.0.0.1")
+            self.assertEqual(client_ip(None, "198.51.100.1"), "unknown")
+
+    def test_key_is_short_hash(self):
+        """Тест фиксированной длины ключа лимитера"""
+        with patch("app.auth.rate_limit.TRUSTED_PROXIES", ()):
+            key = client_key("2001:db8::1")
+            self.assertEqual(len(key), 16)
+            self.assertEqual(key, client_key("2001:db8::1"))
+            self.assertNotEqual(key, client_key("2001:db8::2"))
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)